@@ -1,13 +1,15 @@
-from fastapi import HTTPException, Request
+from fastapi import Depends, HTTPException, Request
 
+from app.utils import session_store
 from app.utils.jwt import JWT
+from app.utils.session import SessionStoreUnavailable
 from app.utils.user import User
 
 
-def get_current_user(request: Request):
+async def get_current_user(request: Request):
     token = request.headers.get("Authorization", "").replace("Bearer ", "")
     payload = JWT.parse_claim(token)
-    username = payload.get("name")
+    username = payload.get("name") if payload else None
     if username is None:
         raise HTTPException(
             status_code=401,
@@ -15,7 +17,21 @@ def get_current_user(request: Request):
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    user = User(username).select_by_username()
+    try:
+        active, user = await session_store.authenticate(payload)
+    except SessionStoreUnavailable:
+        # 响应由 LoadShedMiddleware 替换为带 Retry-After 的 503
+        raise HTTPException(status_code=503, detail="会话存储暂不可用，请稍后重试")
+    if not active:
+        raise HTTPException(
+            status_code=401,
+            detail="登录已失效，请重新登录",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    request.state.session = payload
+
+    if user is None:
+        user = await User(username).select_and_cache()
     if user is None:
         raise HTTPException(
             status_code=401,
@@ -23,3 +39,8 @@ def get_current_user(request: Request):
             headers={"WWW-Authenticate": "Bearer"},
         )
     return user
+
+
+async def get_current_session(request: Request, user=Depends(get_current_user)) -> dict:
+    """当前请求 token 的声明，sub 为会话 id"""
+    return request.state.session
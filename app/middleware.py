@@ -0,0 +1,79 @@
+import json
+import os
+import time
+
+from app.utils.breaker import ConcurrencyLimiter, unavailable_dependencies
+from app.utils.retry import RetryPolicy, request_deadline
+
+
+class LoadShedMiddleware:
+    """过载保护（纯 ASGI 中间件，不缓冲响应体）
+
+    - 同时处理的请求数超过 MAX_CONCURRENT_REQUESTS 时立即返回 503，不再排队等待数据库连接；
+      名额在响应头发出时即归还，视频、图片等长时间的响应体传输不占用名额
+    - 设置请求级重试截止时间，同一请求内所有重试循环共享 RETRY_REQUEST_DEADLINE
+    - 请求处理过程中关键依赖（MySQL）被熔断器拒绝时，把原响应替换为 503 并附带 Retry-After
+    """
+    MAX_CONCURRENT_REQUESTS = int(os.environ.get("MAX_CONCURRENT_REQUESTS", 200))
+
+    def __init__(self, app, max_concurrent_requests: int = None):
+        self.app = app
+        limit = max_concurrent_requests if max_concurrent_requests is not None else self.MAX_CONCURRENT_REQUESTS
+        self.limiter = ConcurrencyLimiter(limit) if limit > 0 else None
+
+    @staticmethod
+    async def _send_unavailable(send, msg: str, retry_after: int):
+        body = json.dumps({"msg": msg, "code": 503, "time": round(time.time() * 1000)},
+                          ensure_ascii=False).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if self.limiter is not None and not self.limiter.try_acquire():
+            await self._send_unavailable(send, "服务繁忙，请稍后重试", 1)
+            return
+
+        rejected = []
+        token = unavailable_dependencies.set(rejected)
+        deadline_token = request_deadline.set(time.monotonic() + RetryPolicy.REQUEST_DEADLINE)
+        replaced = False
+        holding = self.limiter is not None
+
+        def release():
+            nonlocal holding
+            if holding:
+                holding = False
+                self.limiter.release()
+
+        async def guarded_send(message):
+            nonlocal replaced
+            if message["type"] == "http.response.start":
+                # 处理函数（及其数据库访问）到此已结束，之后只剩向客户端发送响应体
+                release()
+            if replaced:
+                return
+            if message["type"] == "http.response.start" and rejected:
+                replaced = True
+                name, retry_after = rejected[0]
+                await self._send_unavailable(send, f"{name} 暂不可用，请稍后重试", retry_after)
+                return
+            await send(message)
+
+        try:
+            await self.app(scope, receive, guarded_send)
+        finally:
+            unavailable_dependencies.reset(token)
+            request_deadline.reset(deadline_token)
+            release()
@@ -1,38 +1,125 @@
-from fastapi import APIRouter, Depends
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, Request
 
 from app.deps import get_current_user
 from app.schemas.book import *
 from app.schemas.common import *
+from app.utils import catalogue_cache
 from app.utils.book import Book
+from app.utils.book_import import BookImporter
 from app.utils.decorators import require_permission
+from app.utils.stats import Stats
 
 router = APIRouter()
 
 
 @router.get("/list")
-def book_list():
-    books = Book().get_list()
-    if not books:
-        return ResponseNormal(msg="暂无数据")
-    return ListBooksResponse(
-        msg="获取图书列表成功",
-        data=books
-    )
+async def book_list(request: Request,
+                    cursor: Optional[int] = Query(default=None, ge=0),
+                    limit: int = Query(default=20, ge=1, le=100),
+                    fields: Optional[str] = Query(default=None),
+                    book_type: Optional[str] = Query(default=None, alias="type"),
+                    available: Optional[bool] = Query(default=None),
+                    all: bool = Query(default=False)):
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    if field_list and not set(field_list) <= set(Book.LIST_FIELDS):
+        return ResponseNormal(msg="fields 参数包含未知字段", code=1)
+
+    async def build():
+        if all:
+            # 兼容模式：一次返回全部图书
+            books = await Book().get_list()
+            if not books:
+                return ResponseNormal(msg="暂无数据")
+            return ListBooksResponse(
+                msg="获取图书列表成功",
+                data=books
+            )
+
+        page = await Book().get_page(cursor, limit, field_list, book_type, available)
+        if page is None:
+            return ResponseNormal(msg="获取图书列表失败", code=1)
+        books, next_cursor = page
+        return ListBooksPageResponse(
+            msg="获取图书列表成功",
+            data=books,
+            nextCursor=next_cursor
+        )
+
+    key = ("list", cursor, limit, tuple(field_list or ()), book_type, available, all)
+    return await catalogue_cache.respond(request, key, build)
+
+
+@router.get("/search")
+async def book_search(request: Request,
+                      keyword: str = Query(min_length=1, max_length=100),
+                      page: int = Query(default=1, ge=1, le=500),
+                      size: int = Query(default=20, ge=1, le=100)):
+    async def build():
+        result = await Book().search_books(keyword, page, size)
+        if result is None:
+            return ResponseNormal(msg="搜索图书失败", code=1)
+        books, has_more = result
+        return SearchBooksResponse(
+            msg="搜索图书成功",
+            data=books,
+            page=page,
+            nextPage=page + 1 if has_more else None
+        )
+
+    return await catalogue_cache.respond(request, ("search", keyword, page, size), build)
+
+
+@router.get("/suggest")
+async def book_suggest(request: Request,
+                       prefix: str = Query(min_length=1, max_length=50),
+                       limit: int = Query(default=10, ge=1, le=50)):
+    async def build():
+        titles = await Book().suggest_titles(prefix, limit)
+        if titles is None:
+            return ResponseNormal(msg="获取书名补全失败", code=1)
+        return DataResponse(msg="获取书名补全成功", data=titles)
+
+    return await catalogue_cache.respond(request, ("suggest", prefix, limit), build)
 
 
 @router.post("/add")
 @require_permission(level=1)
-def book_add(req: AddBooksRequest, user=Depends(get_current_user)):
-    book = Book().add_book(req.data)
-    if book:
-        return ResponseNormal(msg="添加图书成功")
-    return ResponseNormal(msg="添加图书失败", code=1)
+async def book_add(req: AddBooksRequest, user=Depends(get_current_user)):
+    result = await Book().add_book(req.data)
+    if result is None:
+        return ResponseNormal(msg="添加图书失败", code=1)
+    return DataResponse(msg="添加图书成功", data=result)
+
+
+@router.post("/import")
+@require_permission(level=1)
+async def book_import(request: Request, format: Optional[str] = Query(default=None),
+                      importId: Optional[str] = Query(default=None), user=Depends(get_current_user)):
+    fmt = BookImporter.detect_format(request.headers.get("content-type"), format)
+    if fmt not in BookImporter.FORMATS:
+        return ResponseNormal(msg="仅支持 csv 或 jsonl 格式", code=1)
+
+    result = await BookImporter(fmt, importId).run(request.stream())
+    if result.aborted:
+        return DataResponse(msg=f"导入中止: {result.aborted}", data=result, code=1)
+    return DataResponse(msg="导入完成", data=result)
+
+
+@router.get("/import/{importId}")
+@require_permission(level=1)
+async def book_import_progress(importId: str, user=Depends(get_current_user)):
+    progress = await BookImporter.get_progress(importId)
+    if progress is None:
+        return ResponseNormal(msg="导入任务不存在", code=1)
+    return DataResponse(msg="获取导入进度成功", data=progress)
 
 
 @router.post("/update")
 @require_permission(level=1)
-def book_update(req: UpdateBookRequest, user=Depends(get_current_user)):
-    book = Book(req.bookId, req.title, req.author, req.description, req.pic, req.type, req.price, req.count).update_book()
+async def book_update(req: UpdateBookRequest, user=Depends(get_current_user)):
+    book = await Book(req.bookId, req.title, req.author, req.description, req.pic, req.type, req.price, req.count).update_book()
     if book:
         return ResponseNormal(msg="更新图书成功")
     return ResponseNormal(msg="更新图书失败", code=1)
@@ -40,32 +127,123 @@ def book_update(req: UpdateBookRequest, user=Depends(get_current_user)):
 
 @router.get("/del")
 @require_permission(level=1)
-def book_del(bookId: int, user=Depends(get_current_user)):
-    if Book(bookId).del_book():
+async def book_del(bookId: int, user=Depends(get_current_user)):
+    if await Book(bookId).del_book():
         return ResponseNormal(msg="删除图书成功")
     return ResponseNormal(msg="删除图书失败", code=1)
 
 
 @router.post("/borrow")
-def book_borrow(req: BorrowBookRequest, user=Depends(get_current_user)):
-    if Book(req.bookId).borrow_book(req.borrowLong, user.username):
+async def book_borrow(req: BorrowBookRequest, user=Depends(get_current_user)):
+    if await Book(req.bookId).borrow_book(req.borrowLong, user.username):
         return ResponseNormal(msg="借书成功")
     return ResponseNormal(msg="借书失败", code=1)
 
 
 @router.post("/return")
-def book_return(req: ReturnBookRequest, user=Depends(get_current_user)):
-    if Book(req.bookId).return_book(user.username):
+async def book_return(req: ReturnBookRequest, user=Depends(get_current_user)):
+    if await Book(req.bookId).return_book(user.username):
         return ResponseNormal(msg="还书成功")
     return ResponseNormal(msg="还书失败", code=1)
 
 
 @router.get("/borrowList")
-def book_borrow_list(user=Depends(get_current_user)):
-    records = Book().get_circulate_list(user.username, user.permission)
-    if not records:
-        return ResponseNormal(msg="暂无借阅记录")
-    return ListBorrowsResponse(
+async def book_borrow_list(cursor: Optional[str] = Query(default=None, pattern=r"^\d+_\d+$"),
+                           limit: int = Query(default=20, ge=1, le=100),
+                           isReturn: Optional[bool] = Query(default=None),
+                           isTimeOut: Optional[bool] = Query(default=None),
+                           bookId: Optional[int] = Query(default=None),
+                           startTime: Optional[int] = Query(default=None, ge=0),
+                           endTime: Optional[int] = Query(default=None, ge=0),
+                           username: Optional[str] = Query(default=None),
+                           all: bool = Query(default=False),
+                           user=Depends(get_current_user)):
+    if all:
+        # 兼容模式：一次返回全部借阅记录
+        records = await Book().get_circulate_list(user.username, user.permission)
+        if not records:
+            return ResponseNormal(msg="暂无借阅记录")
+        return ListBorrowsResponse(
+            msg="获取借阅列表成功",
+            data=records
+        )
+
+    page = await Book().get_circulate_page(user.username, user.permission, cursor, limit, isReturn, isTimeOut,
+                                           bookId, startTime, endTime, username)
+    if page is None:
+        return ResponseNormal(msg="获取借阅列表失败", code=1)
+    records, next_cursor = page
+    return ListBorrowsPageResponse(
         msg="获取借阅列表成功",
-        data=records
+        data=records,
+        nextCursor=next_cursor
+    )
+
+
+@router.get("/overdue")
+async def book_overdue(cursor: Optional[str] = Query(default=None, pattern=r"^\d+_\d+$"),
+                       limit: int = Query(default=20, ge=1, le=100),
+                       username: Optional[str] = Query(default=None),
+                       user=Depends(get_current_user)):
+    page = await Book().get_overdue_page(user.username, user.permission, cursor, limit, username)
+    if page is None:
+        return ResponseNormal(msg="获取逾期列表失败", code=1)
+    records, next_cursor = page
+    return ListBorrowsPageResponse(
+        msg="获取逾期列表成功",
+        data=records,
+        nextCursor=next_cursor
     )
+
+
+@router.get("/stats/summary")
+@require_permission(level=1)
+async def book_stats_summary(user=Depends(get_current_user)):
+    stats = await Stats().get_summary()
+    if stats is None:
+        return ResponseNormal(msg="获取借阅统计失败", code=1)
+    return DataResponse(msg="获取借阅统计成功", data=stats)
+
+
+@router.get("/stats/top")
+@require_permission(level=1)
+async def book_stats_top(limit: int = Query(default=10, ge=1, le=100), user=Depends(get_current_user)):
+    stats = await Stats().get_top_books(limit)
+    if stats is None:
+        return ResponseNormal(msg="获取热门图书失败", code=1)
+    return DataResponse(msg="获取热门图书成功", data=stats)
+
+
+@router.get("/stats/borrowers")
+@require_permission(level=1)
+async def book_stats_borrowers(limit: int = Query(default=10, ge=1, le=100), user=Depends(get_current_user)):
+    stats = await Stats().get_top_borrowers(limit)
+    if stats is None:
+        return ResponseNormal(msg="获取在借用户排行失败", code=1)
+    return DataResponse(msg="获取在借用户排行成功", data=stats)
+
+
+@router.get("/stats/book/{bookId}")
+@require_permission(level=1)
+async def book_stats_book(bookId: int, user=Depends(get_current_user)):
+    stats = await Stats().get_book_stats(bookId)
+    if stats is None:
+        return ResponseNormal(msg="获取图书借阅统计失败", code=1)
+    return DataResponse(msg="获取图书借阅统计成功", data=stats)
+
+
+@router.get("/stats/user/{username}")
+@require_permission(level=1)
+async def book_stats_user(username: str, user=Depends(get_current_user)):
+    stats = await Stats().get_user_stats(username)
+    if stats is None:
+        return ResponseNormal(msg="获取用户借阅统计失败", code=1)
+    return DataResponse(msg="获取用户借阅统计成功", data=stats)
+
+
+@router.post("/stats/rebuild")
+@require_permission(level=1)
+async def book_stats_rebuild(user=Depends(get_current_user)):
+    if not await Stats().rebuild():
+        return ResponseNormal(msg="重建借阅统计失败", code=1)
+    return ResponseNormal(msg="重建借阅统计成功")
@@ -1,20 +1,28 @@
-from fastapi import APIRouter, Depends
-from app.deps import get_current_user
+from fastapi import APIRouter, Depends, Request
+from starlette.concurrency import run_in_threadpool
+from app.deps import get_current_session, get_current_user
 from app.schemas.user import *
 from app.schemas.common import *
 from app.utils.decorators import handle_response, match_username, require_permission
-from app.utils.jwt import JWT
 from app.utils.register import Register
 from app.utils.login import Login
 from app.utils.user import User
 from app.utils.email import Email
 from app.utils.phone import Phone
 from app.utils.realname import RealName
-from app.utils import r
+from app.utils import session_store
 
 router = APIRouter()
 
 
+def _create_session(request: Request, username: str) -> str:
+    return session_store.create(
+        username,
+        device=request.headers.get("user-agent", ""),
+        ip=request.client.host if request.client else ""
+    )
+
+
 @router.post("/register")
 def register(req: RegisterRequest):
     return Register(req.username, req.password, req.email).register()
@@ -27,48 +35,75 @@ def resend_email(user=Depends(get_current_user)):
 
 
 @router.get("/verifyEmail")
-def verify_email(token: str):
+def verify_email(token: str, request: Request):
     data = Email().verify_email(token)
     if not data:
         return False
 
-    access_token = r.get(data['username']) or JWT.gen_access_token(data['username'])
-    if not r.get(data['username']):
-        r.set(data['username'], access_token, 60 * 60 * 24)
+    access_token = _create_session(request, data['username'])
 
     return EmailResponse(msg="邮件验证成功", email=data['email'], token=access_token)
 
 
 @router.post("/login")
-def login(req: LoginRequest):
-    user = Login(req.username, req.password).login()
+async def login(req: LoginRequest, request: Request):
+    user = await Login(req.username, req.password).login()
     if not user:
         return ResponseNormal(msg="用户名或密码错误", code=1)
 
-    access_token = r.get(user.username) or JWT.gen_access_token(user.username)
-    if not r.get(user.username):
-        r.set(user.username, access_token, 60 * 60 * 24)
+    access_token = await run_in_threadpool(_create_session, request, user.username)
 
     return LoginResponse(token=access_token, data=user, msg="登录成功")
 
 
 @router.get("/logout")
 @handle_response
-def logout(user=Depends(get_current_user)):
-    r.delete(user.username)
-    return True
+def logout(user=Depends(get_current_user), session=Depends(get_current_session)):
+    return session_store.revoke(user.username, session["sub"], session.get("exp", 0) * 1000)
+
+
+@router.get("/sessions")
+def list_sessions(user=Depends(get_current_user), session=Depends(get_current_session)):
+    sessions = session_store.list_sessions(user.username)
+    if sessions is None:
+        return ResponseNormal(msg="获取登录设备失败", code=1)
+    return DataResponse(
+        msg="获取登录设备成功",
+        data=[SessionInfo(**item, current=item["sessionId"] == session["sub"]) for item in sessions]
+    )
+
+
+@router.post("/revokeSession")
+@handle_response
+def revoke_session(req: RevokeSessionRequest, user=Depends(get_current_user)):
+    return session_store.revoke_owned(user.username, req.sessionId)
+
+
+@router.get("/logoutAll")
+@handle_response
+def logout_all(user=Depends(get_current_user)):
+    return session_store.revoke_all(user.username) is not None
+
+
+@router.post("/forceLogout")
+@require_permission(level=1)
+def force_logout(req: ForceLogoutRequest, user=Depends(get_current_user)):
+    revoked = session_store.revoke_all(req.username)
+    if revoked is None:
+        return ResponseNormal(msg="注销会话失败", code=1)
+    return DataResponse(msg="已注销该用户的全部会话", data={"username": req.username, "sessions": revoked})
 
 
 @router.get("/getUserInfo")
 @handle_response
-def get_user_info(user=Depends(get_current_user)):
+async def get_user_info(user=Depends(get_current_user)):
     return user
 
 
 @router.get("/getAllUserInfo")
 @require_permission(level=0)
-def get_all_user_info(user=Depends(get_current_user)):
-    users = User(user.username).select_all()
+async def get_all_user_info(user=Depends(get_current_user)):
+    users = await User(user.username).select_all()
     return DataResponse(
         msg="获取用户信息成功",
         data=users
@@ -78,8 +113,8 @@ def get_all_user_info(user=Depends(get_current_user)):
 @router.post("/sendPhoneCode")
 @handle_response
 @match_username("username")
-def send_phone_code(req: PhoneRequest, user=Depends(get_current_user)):
-    phone_info = User(user.username).get_phone_info()
+async def send_phone_code(req: PhoneRequest, user=Depends(get_current_user)):
+    phone_info = await User(user.username).get_phone_info()
     if phone_info:
         return False
 
@@ -87,7 +122,7 @@ def send_phone_code(req: PhoneRequest, user=Depends(get_current_user)):
     if not phone.validate():
         return False
 
-    return phone.send_code()
+    return await run_in_threadpool(phone.send_code)
 
 
 @router.post("/verifyPhone")
@@ -0,0 +1,37 @@
+"""RSA 解密子进程中执行的函数
+
+子进程以 forkserver / spawn 方式启动时会重新导入本模块，因此这里不能导入 app.utils
+（其 __init__ 会创建数据库与 Redis 连接池），只依赖 cryptography。
+"""
+import base64
+from typing import Optional
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import padding
+from cryptography.hazmat.primitives.asymmetric.rsa import RSAPrivateKey
+
+_worker_private_key: Optional[RSAPrivateKey] = None
+
+
+def decrypt_with_key(private_key: RSAPrivateKey, encrypted_base64: str,
+                     encoding: str = "utf-8") -> Optional[str]:
+    try:
+        encrypted_bytes = base64.b64decode(encrypted_base64)
+        decrypted = private_key.decrypt(
+            encrypted_bytes,
+            padding.PKCS1v15()
+        )
+        return decrypted.decode(encoding)
+    except (ValueError, TypeError) as e:
+        print(f"解密失败: {e}")
+        return None
+
+
+def init_decrypt_worker(private_pem: bytes):
+    """解密子进程初始化：每个进程只解析一次私钥"""
+    global _worker_private_key
+    _worker_private_key = serialization.load_pem_private_key(private_pem, password=None)
+
+
+def decrypt_in_worker(encrypted_base64: str, encoding: str = "utf-8") -> Optional[str]:
+    return decrypt_with_key(_worker_private_key, encrypted_base64, encoding)
@@ -41,6 +41,29 @@ class AddBooksRequest(BaseModel):
     data: list[AddBookRequest]
 
 
+class AddBooksResult(BaseModel):
+    inserted: int
+    chunks: list[int]
+    firstBookId: int
+    lastBookId: int
+
+
+class ImportRowError(BaseModel):
+    line: int
+    error: str
+
+
+class ImportBooksResult(BaseModel):
+    importId: str
+    processed: int = 0
+    inserted: int = 0
+    failed: int = 0
+    batches: list[int] = []
+    errors: list[ImportRowError] = []
+    aborted: str | None = None
+    finished: bool = False
+
+
 class UpdateBookRequest(BaseModel):
     bookId: int
     title: str
@@ -68,8 +91,50 @@ class ListBooksResponse(BaseModel):
     time: int = round(time.time() * 1000)
 
 
+class ListBooksPageResponse(BaseModel):
+    msg: str
+    data: list[dict]
+    nextCursor: int | None = None
+    code: int = 0
+    time: int = round(time.time() * 1000)
+
+
+class SearchBooksResponse(BaseModel):
+    msg: str
+    data: list[BookDataBase]
+    page: int
+    nextPage: int | None = None
+    code: int = 0
+    time: int = round(time.time() * 1000)
+
+
 class ListBorrowsResponse(BaseModel):
     msg: str
     data: list[BorrowInfo]
     code: int = 0
     time: int = round(time.time() * 1000)
+
+
+class ListBorrowsPageResponse(BaseModel):
+    msg: str
+    data: list[BorrowInfo]
+    nextCursor: str | None = None
+    code: int = 0
+    time: int = round(time.time() * 1000)
+
+
+class CirculationStats(BaseModel):
+    borrowTotal: int = 0
+    activeLoans: int = 0
+    returnedTotal: int = 0
+    lateReturns: int = 0
+    lateReturnRate: float = 0.0
+
+
+class BookStats(CirculationStats):
+    bookId: int
+    title: str | None = None
+
+
+class UserStats(CirculationStats):
+    username: str
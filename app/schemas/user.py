@@ -29,6 +29,15 @@ class UserInfo(BaseModel):
     phone: str = None
 
 
+class SessionInfo(BaseModel):
+    sessionId: str
+    device: str
+    ip: str
+    createTime: int
+    expireTime: int
+    current: bool = False
+
+
 class PhoneInfo(BaseModel):
     phone: str
     phoneVerificationCode: str
@@ -52,6 +61,14 @@ class LoginRequest(BaseModel):
     password: str
 
 
+class RevokeSessionRequest(BaseModel):
+    sessionId: str
+
+
+class ForceLogoutRequest(BaseModel):
+    username: str
+
+
 class PhoneRequest(BaseModel):
     username: str
     phone: str
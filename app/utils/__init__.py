@@ -1,10 +1,29 @@
 # -*- coding: utf-8 -*-
+import os
+
 from dotenv import load_dotenv
 
 load_dotenv(override=True)
 
 from .mysql import DatabaseManager
+from .async_mysql import AsyncDatabaseManager
 from .redis import Redis
+from .cache import CatalogueCache, UserCache
+from .verification import VerificationTokenStore
+from .session import SessionStore
 
 db_manager = DatabaseManager()
+async_db_manager = AsyncDatabaseManager()
 r = Redis()
+user_cache = UserCache(r)
+catalogue_cache = CatalogueCache(r)
+email_token_store = VerificationTokenStore(
+    r, "email_verify",
+    ttl=int(os.environ.get("EMAIL_TOKEN_TTL", 24 * 60 * 60)),
+    resend_interval=int(os.environ.get("EMAIL_RESEND_INTERVAL", 60))
+)
+session_store = SessionStore(
+    r, user_cache,
+    ttl=int(os.environ.get("SESSION_TTL", 24 * 60 * 60)),
+    max_sessions=int(os.environ.get("SESSION_MAX_PER_USER", 10))
+)
@@ -0,0 +1,105 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator
+
+import aiomysql
+from aiomysql import MySQLError
+
+from .breaker import CircuitBreaker, CircuitOpenError
+
+
+class AsyncDatabaseUnavailableError(CircuitOpenError, MySQLError):
+    """MySQL 熔断中"""
+
+
+class AsyncDatabaseManager:
+    def __init__(self):
+        self.connection_pool = None
+        self._pool_lock = None
+        self.breaker = CircuitBreaker("MySQL(async)", AsyncDatabaseUnavailableError)
+
+    async def _init_connection_pool(self):
+        """初始化异步数据库连接池"""
+        try:
+            self.connection_pool = await aiomysql.create_pool(
+                minsize=1,
+                maxsize=int(os.getenv('MYSQL_ASYNC_POOL_SIZE', 10)),
+                host=os.getenv('MYSQL_HOST'),
+                port=int(os.getenv('MYSQL_PORT', 3306)),
+                db=os.getenv('MYSQL_DB'),
+                user=os.getenv('MYSQL_USER'),
+                password=os.getenv('MYSQL_PASSWORD'),
+                autocommit=True,
+                connect_timeout=30,
+                pool_recycle=3600
+            )
+            print("异步数据库连接池初始化成功")
+        except MySQLError as e:
+            print(f"异步数据库连接池初始化失败: {e}")
+            raise
+
+    async def _ensure_pool(self):
+        """按需创建连接池（连接池必须在事件循环内创建）"""
+        if self.connection_pool is not None:
+            return
+        if self._pool_lock is None:
+            self._pool_lock = asyncio.Lock()
+        async with self._pool_lock:
+            if self.connection_pool is None:
+                await self._init_connection_pool()
+
+    async def close(self):
+        """关闭连接池"""
+        if self.connection_pool is not None:
+            self.connection_pool.close()
+            await self.connection_pool.wait_closed()
+            self.connection_pool = None
+
+    @asynccontextmanager
+    async def get_connection(self) -> AsyncGenerator:
+        """获取数据库连接的异步上下文管理器；熔断时直接抛出 AsyncDatabaseUnavailableError"""
+        self.breaker.before_call()
+        connection = None
+        failed = False
+        try:
+            await self._ensure_pool()
+            connection = await self.connection_pool.acquire()
+            yield connection
+        except MySQLError as e:
+            failed = True
+            self.breaker.record_failure(e)
+            print(f"获取数据库连接失败: {e}")
+            raise
+        finally:
+            if not failed:
+                self.breaker.record_success()
+            if connection:
+                self.connection_pool.release(connection)
+
+    @asynccontextmanager
+    async def get_cursor(self, dictionary: bool = True) -> AsyncGenerator:
+        """获取游标的异步上下文管理器"""
+        async with self.get_connection() as connection:
+            cursor = None
+            try:
+                cursor = await connection.cursor(aiomysql.DictCursor if dictionary else aiomysql.Cursor)
+                yield cursor
+            finally:
+                if cursor:
+                    await cursor.close()
+
+    @asynccontextmanager
+    async def transaction(self, dictionary: bool = True) -> AsyncGenerator:
+        """在单个事务中执行的游标上下文管理器：正常退出时提交，异常时回滚"""
+        async with self.get_connection() as connection:
+            cursor = await connection.cursor(aiomysql.DictCursor if dictionary else aiomysql.Cursor)
+            try:
+                await connection.begin()
+                yield cursor
+                await connection.commit()
+            except BaseException:
+                await connection.rollback()
+                raise
+            finally:
+                await cursor.close()
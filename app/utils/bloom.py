@@ -0,0 +1,130 @@
+import asyncio
+import hashlib
+import math
+import os
+import threading
+from typing import Optional
+
+from aiomysql import MySQLError
+
+from . import async_db_manager
+
+
+class BloomFilter:
+    """布隆过滤器：返回 False 表示一定不存在，返回 True 表示可能存在。线程安全。"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self._lock = threading.Lock()
+
+    def _positions(self, value: str):
+        digest = hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, value: str):
+        positions = self._positions(value)
+        with self._lock:
+            for position in positions:
+                self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class RegistrationIndex:
+    """已注册用户名 / 邮箱的内存布隆过滤器，用于注册前快速判断“一定未被占用”
+
+    启动时按主键分批预热，之后定期增量拉取新用户；本进程注册成功后立即加入。
+    只作为预检查，唯一性仍由 users 表的唯一索引保证。
+    """
+    CAPACITY = int(os.environ.get("REGISTRATION_BLOOM_CAPACITY", 1000000))
+    ERROR_RATE = float(os.environ.get("REGISTRATION_BLOOM_ERROR_RATE", 0.01))
+    REFRESH_INTERVAL = int(os.environ.get("REGISTRATION_BLOOM_REFRESH_INTERVAL", 30))
+    BATCH_SIZE = 10000
+
+    def __init__(self):
+        self.db_manager = async_db_manager
+        self.usernames: Optional[BloomFilter] = None
+        self.emails: Optional[BloomFilter] = None
+        self.ready = False
+        self.last_id = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def normalize(value: str) -> str:
+        # 与 users 表唯一索引的 *_ci 排序规则保持一致：不区分大小写、忽略尾部空格
+        return value.rstrip(" ").lower()
+
+    def add(self, username: str, email: str):
+        if self.usernames is None:
+            return
+        self.usernames.add(self.normalize(username))
+        self.emails.add(self.normalize(email))
+
+    def might_exist(self, username: str, email: str) -> bool:
+        """False 表示用户名和邮箱都一定未被占用；预热完成前始终返回 True"""
+        if not self.ready:
+            return True
+        return self.normalize(username) in self.usernames or self.normalize(email) in self.emails
+
+    async def _load(self):
+        """拉取 id 大于 last_id 的全部用户"""
+        while True:
+            async with self.db_manager.get_cursor(dictionary=False) as cursor:
+                await cursor.execute("SELECT id, username, email FROM users WHERE id > %s ORDER BY id LIMIT %s",
+                                     (self.last_id, self.BATCH_SIZE))
+                rows = await cursor.fetchall()
+            for _, username, email in rows:
+                self.add(username, email)
+            if rows:
+                self.last_id = rows[-1][0]
+            if len(rows) < self.BATCH_SIZE:
+                return
+
+    async def warm(self):
+        async with self.db_manager.get_cursor(dictionary=False) as cursor:
+            await cursor.execute("SELECT MAX(id) FROM users")
+            max_id = (await cursor.fetchone())[0] or 0
+        capacity = max(self.CAPACITY, max_id * 2)
+        self.usernames = BloomFilter(capacity, self.ERROR_RATE)
+        self.emails = BloomFilter(capacity, self.ERROR_RATE)
+        self.last_id = 0
+        await self._load()
+        self.ready = True
+        print(f"注册预检查布隆过滤器已就绪，容量: {capacity}")
+
+    async def _run(self):
+        while True:
+            try:
+                if self.ready:
+                    await self._load()
+                else:
+                    await self.warm()
+            except MySQLError as e:
+                print(f"刷新注册预检查数据失败: {e}")
+            except Exception as e:
+                print(f"刷新注册预检查数据未知错误: {e}")
+            await asyncio.sleep(self.REFRESH_INTERVAL)
+
+    def start(self) -> bool:
+        """在当前事件循环中启动预热与增量刷新，REGISTRATION_BLOOM_REFRESH_INTERVAL 为 0 时不启用"""
+        if self.REFRESH_INTERVAL <= 0 or self._task is not None:
+            return False
+        self._task = asyncio.create_task(self._run())
+        return True
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+registration_index = RegistrationIndex()
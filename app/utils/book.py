@@ -1,13 +1,24 @@
-from typing import Optional, List
+import asyncio
+import os
+import time
+from typing import Optional, List, Tuple
 
-from mysql.connector import Error as MySQLError
+from aiomysql import MySQLError
 
 from app.schemas.book import *
-from app.schemas.book import BookDataBase, BorrowInfo
-from . import db_manager
+from app.schemas.book import AddBooksResult, BookDataBase, BorrowInfo
+from . import async_db_manager, catalogue_cache
+from .stats import Stats
+from .retry import request_deadline, retry_policy
 
 
 class Book:
+    ADD_CHUNK_SIZE = int(os.environ.get("BOOK_ADD_CHUNK_SIZE", 1000))
+    ADD_LOCK_NAME = "books:add_book"
+    ADD_LOCK_TIMEOUT = 10
+    LIST_FIELDS = tuple(BookDataBase.model_fields)
+    BORROW_QUEUE_ENABLED = os.environ.get("BORROW_QUEUE_ENABLED", "0") == "1"
+
     def __init__(self, book_id: int = None, title: str = None, author: str = None,
                  description: str = None, pic: str = None, book_type: str = None,
                  price: int = None, count: int = None):
@@ -19,18 +30,17 @@ class Book:
         self.type = book_type
         self.price = price
         self.count = count
-        self.db_manager = db_manager
+        self.db_manager = async_db_manager
 
-    def get_list(self) -> Optional[List[BookDataBase]]:
+    async def get_list(self) -> Optional[List[BookDataBase]]:
         """获取图书列表"""
-        max_retries = 3
-        for attempt in range(max_retries):
+        for attempt in retry_policy.attempts():
             try:
-                with self.db_manager.get_cursor(dictionary=True) as cursor:
+                async with self.db_manager.get_cursor(dictionary=True) as cursor:
                     sql = "SELECT * FROM books"
 
-                    cursor.execute(sql)
-                    results = cursor.fetchall()
+                    await cursor.execute(sql)
+                    results = await cursor.fetchall()
 
                     if not results:
                         print("没有找到图书数据")
@@ -59,57 +69,119 @@ class Book:
                     return books
 
             except MySQLError as e:
-                print(f"获取图书列表数据库错误 (尝试 {attempt + 1}/{max_retries}): {e}")
-                if attempt == max_retries - 1:
+                print(f"获取图书列表数据库错误 (尝试 {attempt}): {e}")
+                if not await attempt.backoff_async(e):
                     return None
-                time.sleep(1)
             except Exception as e:
-                print(f"获取图书列表未知错误 (尝试 {attempt + 1}/{max_retries}): {e}")
-                if attempt == max_retries - 1:
+                print(f"获取图书列表未知错误 (尝试 {attempt}): {e}")
+                if not await attempt.backoff_async(e):
                     return None
-                time.sleep(1)
 
-    def add_book(self, books: list[AddBookRequest]) -> bool | None:
-        """添加图书"""
-        max_retries = 3
-        for attempt in range(max_retries):
+    async def get_page(self, cursor: Optional[int] = None, limit: int = 20, fields: Optional[List[str]] = None,
+                       book_type: Optional[str] = None,
+                       available: Optional[bool] = None) -> Optional[Tuple[List[dict], Optional[int]]]:
+        """按 book_id 键集分页获取图书，支持字段投影与类型 / 可借过滤
+
+        返回 (当前页数据, 下一页游标)，没有更多数据时游标为 None。
+        """
+        columns = list(dict.fromkeys(["book_id", *(fields or self.LIST_FIELDS)]))
+        conditions, params = ["book_id > %s"], [cursor or 0]
+        if book_type is not None:
+            conditions.append("type = %s")
+            params.append(book_type)
+        if available is True:
+            conditions.append("count - borrow_count > 0")
+        elif available is False:
+            conditions.append("count - borrow_count <= 0")
+
+        sql = (f"SELECT {', '.join(f'`{c}`' for c in columns)} FROM books "
+               f"WHERE {' AND '.join(conditions)} ORDER BY book_id LIMIT %s")
+        params.append(limit + 1)
+
+        for attempt in retry_policy.attempts():
             try:
-                with self.db_manager.get_cursor() as cursor:
-                    cursor.execute("SELECT MAX(book_id) FROM books")
-                    result = cursor.fetchone()
-                    current_max_id = result[0] if result[0] is not None else 100000
-
-                    for book in books:
-                        book_id = current_max_id + 1
-                        current_max_id = book_id
-
-                        sql = """
-                              INSERT INTO books
-                              (book_id, title, author, description, pic, type, price, count, borrow_count)
-                              VALUES (%s, %s, %s, %s, %s, %s, %s, %s, 0) \
-                              """
-                        cursor.execute(sql, (
-                            book_id, book.title, book.author, book.description,
-                            book.pic, book.type, book.price, book.count
-                        ))
+                async with self.db_manager.get_cursor(dictionary=True) as db_cursor:
+                    await db_cursor.execute(sql, tuple(params))
+                    rows = list(await db_cursor.fetchall())
+
+                next_cursor = None
+                if len(rows) > limit:
+                    rows = rows[:limit]
+                    next_cursor = rows[-1]['book_id']
+                if fields and "book_id" not in fields:
+                    for row in rows:
+                        del row['book_id']
+                return rows, next_cursor
 
-                    return True
+            except MySQLError as e:
+                print(f"分页获取图书失败 (尝试 {attempt}): {e}")
+                if not await attempt.backoff_async(e):
+                    return None
+            except Exception as e:
+                print(f"分页获取图书未知错误: {e}")
+                return None
+
+    async def add_book(self, books: list[AddBookRequest], chunk_size: int = None) -> Optional[AddBooksResult]:
+        """批量添加图书：单事务内分块多行插入，book_id 在命名锁保护下预留"""
+        chunk_size = chunk_size or self.ADD_CHUNK_SIZE
+        sql = """
+              INSERT INTO books
+              (book_id, title, author, description, pic, type, price, count, borrow_count)
+              VALUES (%s, %s, %s, %s, %s, %s, %s, %s, 0) \
+              """
+        for attempt in retry_policy.attempts():
+            try:
+                async with self.db_manager.get_connection() as connection:
+                    async with connection.cursor() as cursor:
+                        await cursor.execute("SELECT GET_LOCK(%s, %s)", (self.ADD_LOCK_NAME, self.ADD_LOCK_TIMEOUT))
+                        locked = await cursor.fetchone()
+                        if not locked or locked[0] != 1:
+                            raise MySQLError("获取图书编号锁超时")
+                        try:
+                            await connection.begin()
+                            await cursor.execute("SELECT MAX(book_id) FROM books")
+                            result = await cursor.fetchone()
+                            current_max_id = result[0] if result[0] is not None else 100000
+                            first_id = current_max_id + 1
+
+                            chunks = []
+                            for offset in range(0, len(books), chunk_size):
+                                chunk = books[offset:offset + chunk_size]
+                                await cursor.executemany(sql, [
+                                    (first_id + offset + i, book.title, book.author, book.description,
+                                     book.pic, book.type, book.price, book.count)
+                                    for i, book in enumerate(chunk)
+                                ])
+                                chunks.append(cursor.rowcount)
+
+                            await connection.commit()
+                        except BaseException:
+                            await connection.rollback()
+                            raise
+                        finally:
+                            await cursor.execute("SELECT RELEASE_LOCK(%s)", (self.ADD_LOCK_NAME,))
+
+                    await catalogue_cache.bump()
+                    return AddBooksResult(
+                        inserted=sum(chunks),
+                        chunks=chunks,
+                        firstBookId=first_id,
+                        lastBookId=first_id + len(books) - 1
+                    )
 
             except MySQLError as e:
-                print(f"添加图书失败 (尝试 {attempt + 1}/{max_retries}): {e}")
-                if attempt == max_retries - 1:
-                    return False
-                time.sleep(1)
+                print(f"添加图书失败 (尝试 {attempt}): {e}")
+                if not await attempt.backoff_async(e):
+                    return None
             except Exception as e:
                 print(f"未知错误: {e}")
-                return False
+                return None
 
-    def update_book(self) -> bool | None:
+    async def update_book(self) -> bool | None:
         """更新图书信息"""
-        max_retries = 3
-        for attempt in range(max_retries):
+        for attempt in retry_policy.attempts():
             try:
-                with self.db_manager.get_cursor() as cursor:
+                async with self.db_manager.get_cursor() as cursor:
                     sql = """
                           UPDATE books \
                           SET title=%s, \
@@ -121,7 +193,7 @@ class Book:
                               count=%s \
                           WHERE book_id = %s \
                           """
-                    cursor.execute(sql, (
+                    await cursor.execute(sql, (
                         self.title, self.author, self.description, self.pic,
                         self.type, self.price, self.count, self.book_id
                     ))
@@ -129,25 +201,24 @@ class Book:
                     if cursor.rowcount == 0:
                         return False
 
+                    await catalogue_cache.bump()
                     return True
 
             except MySQLError as e:
-                print(f"更新图书失败 (尝试 {attempt + 1}/{max_retries}): {e}")
-                if attempt == max_retries - 1:
+                print(f"更新图书失败 (尝试 {attempt}): {e}")
+                if not await attempt.backoff_async(e):
                     return False
-                time.sleep(1)
             except Exception as e:
                 print(f"未知错误: {e}")
                 return False
 
-    def del_book(self) -> bool | None:
+    async def del_book(self) -> bool | None:
         """删除图书"""
-        max_retries = 3
-        for attempt in range(max_retries):
+        for attempt in retry_policy.attempts():
             try:
-                with self.db_manager.get_cursor() as cursor:
-                    cursor.execute("SELECT borrow_count FROM books WHERE book_id=%s", (self.book_id,))
-                    result = cursor.fetchone()
+                async with self.db_manager.get_cursor(dictionary=False) as cursor:
+                    await cursor.execute("SELECT borrow_count FROM books WHERE book_id=%s", (self.book_id,))
+                    result = await cursor.fetchone()
                     if not result:
                         return False
 
@@ -155,67 +226,102 @@ class Book:
                     if borrow_count > 0:
                         return False
 
-                    cursor.execute("DELETE FROM books WHERE book_id=%s", (self.book_id,))
+                    await cursor.execute("DELETE FROM books WHERE book_id=%s", (self.book_id,))
 
                     if cursor.rowcount == 0:
                         return False
 
+                    await catalogue_cache.bump()
                     return True
 
             except MySQLError as e:
-                print(f"删除图书失败 (尝试 {attempt + 1}/{max_retries}): {e}")
-                if attempt == max_retries - 1:
+                print(f"删除图书失败 (尝试 {attempt}): {e}")
+                if not await attempt.backoff_async(e):
                     return False
-                time.sleep(1)
             except Exception as e:
                 print(f"未知错误: {e}")
                 return False
 
-    def borrow_book(self, borrow_long: int, username: str) -> bool | None:
-        """借阅图书"""
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                with (self.db_manager.get_cursor() as cursor):
-                    cursor.execute("SELECT borrow_count, count FROM books WHERE book_id=%s", (self.book_id,))
-                    result = cursor.fetchone()
-                    print( result)
-                    if not result:
-                        return False
+    async def borrow_book(self, borrow_long: int, username: str) -> bool | None:
+        """借阅图书：条件更新库存与写入借阅记录在同一事务内完成，避免并发超借"""
+        if self.BORROW_QUEUE_ENABLED:
+            return await borrow_queue.submit(self.book_id, borrow_long, username)
 
-                    borrow_count = result["borrow_count"]
-                    total_count = result["count"]
-                    if total_count - borrow_count <= 0:
+        for attempt in retry_policy.attempts():
+            try:
+                async with self.db_manager.transaction() as cursor:
+                    await cursor.execute("""
+                                   UPDATE books
+                                   SET borrow_count = borrow_count + 1
+                                   WHERE book_id = %s
+                                     AND count - borrow_count > 0
+                                   """, (self.book_id,))
+                    if cursor.rowcount == 0:
                         return False
 
-                    cursor.execute("UPDATE books SET borrow_count=%s WHERE book_id=%s",
-                                   (borrow_count + 1, self.book_id))
-
                     borrow_time = int(time.time() * 1000)
-                    cursor.execute("""
+                    await cursor.execute("""
                                    INSERT INTO circulate
                                        (book_id, borrow_long, borrow_time, username, is_time_out, is_return)
                                    VALUES (%s, %s, %s, %s, 0, 0)
                                    """, (self.book_id, borrow_long, borrow_time, username))
+                    await Stats.record_borrows(cursor, self.book_id, [username])
 
-                    return True
+                await catalogue_cache.bump()
+                return True
 
             except MySQLError as e:
-                print(f"借阅图书失败 (尝试 {attempt + 1}/{max_retries}): {e}")
-                if attempt == max_retries - 1:
+                print(f"借阅图书失败 (尝试 {attempt}): {e}")
+                if not await attempt.backoff_async(e):
                     return False
-                time.sleep(1)
             except Exception as e:
                 print(f"未知错误: {e}")
                 return False
 
-    def return_book(self, username: str) -> bool | None:
+    async def borrow_batch(self, requests: List[Tuple[int, str]]) -> List[bool]:
+        """批量借阅同一本书：一次加锁读取库存，按请求顺序发放至库存上限，只写一次 books"""
+        for attempt in retry_policy.attempts():
+            try:
+                async with self.db_manager.transaction() as cursor:
+                    await cursor.execute(
+                        "SELECT count - borrow_count AS available FROM books WHERE book_id = %s FOR UPDATE",
+                        (self.book_id,)
+                    )
+                    result = await cursor.fetchone()
+                    granted = min(max(result["available"], 0), len(requests)) if result else 0
+                    if granted == 0:
+                        return [False] * len(requests)
+
+                    await cursor.execute("UPDATE books SET borrow_count = borrow_count + %s WHERE book_id = %s",
+                                         (granted, self.book_id))
+
+                    borrow_time = int(time.time() * 1000)
+                    await cursor.executemany("""
+                                   INSERT INTO circulate
+                                       (book_id, borrow_long, borrow_time, username, is_time_out, is_return)
+                                   VALUES (%s, %s, %s, %s, 0, 0)
+                                   """, [(self.book_id, borrow_long, borrow_time, username)
+                                         for borrow_long, username in requests[:granted]])
+                    await Stats.record_borrows(cursor, self.book_id,
+                                               [username for _, username in requests[:granted]])
+
+                await catalogue_cache.bump()
+                return [True] * granted + [False] * (len(requests) - granted)
+
+            except MySQLError as e:
+                print(f"批量借阅图书失败 (尝试 {attempt}): {e}")
+                if not await attempt.backoff_async(e):
+                    return [False] * len(requests)
+            except Exception as e:
+                print(f"未知错误: {e}")
+                return [False] * len(requests)
+
+    async def return_book(self, username: str) -> bool | None:
         """归还图书"""
-        max_retries = 3
-        for attempt in range(max_retries):
+        for attempt in retry_policy.attempts():
             try:
-                with self.db_manager.get_cursor() as cursor:
-                    cursor.execute("""
+                async with self.db_manager.transaction() as cursor:
+                    await cursor.execute("""
                                    SELECT id, borrow_time, borrow_long
                                    FROM circulate
                                    WHERE book_id = %s
@@ -223,9 +329,10 @@ class Book:
                                      AND is_return = 0
                                    ORDER BY borrow_time DESC
                                    LIMIT 1
+                                   FOR UPDATE
                                    """, (self.book_id, username))
 
-                    record = cursor.fetchone()
+                    record = await cursor.fetchone()
                     if not record:
                         return False
 
@@ -236,90 +343,165 @@ class Book:
 
                     is_time_out = 1 if return_time - borrow_time > borrow_long * 24 * 60 * 60 * 1000 else 0
 
-                    cursor.execute("""
+                    await cursor.execute("""
                                    UPDATE circulate
                                    SET return_time=%s,
                                        is_return=1,
                                        is_time_out=%s
                                    WHERE id = %s
+                                     AND is_return = 0
                                    """, (return_time, is_time_out, record_id))
+                    if cursor.rowcount == 0:
+                        return False
 
-                    cursor.execute("UPDATE books SET borrow_count=borrow_count-1 WHERE book_id=%s",
-                                   (self.book_id,))
+                    await cursor.execute("""
+                                   UPDATE books
+                                   SET borrow_count = borrow_count - 1
+                                   WHERE book_id = %s
+                                     AND borrow_count > 0
+                                   """, (self.book_id,))
+                    await Stats.record_return(cursor, self.book_id, username, bool(is_time_out))
 
-                    return True
+                await catalogue_cache.bump()
+                return True
 
             except MySQLError as e:
-                print(f"归还图书失败 (尝试 {attempt + 1}/{max_retries}): {e}")
-                if attempt == max_retries - 1:
+                print(f"归还图书失败 (尝试 {attempt}): {e}")
+                if not await attempt.backoff_async(e):
                     return False
-                time.sleep(1)
             except Exception as e:
                 print(f"未知错误: {e}")
                 return False
 
-    def get_circulate_list(self, username: str, permission: int) -> list[BorrowInfo] | None:
+    async def get_circulate_list(self, username: str, permission: int) -> list[BorrowInfo] | None:
         """获取借阅记录"""
-        max_retries = 3
-        for attempt in range(max_retries):
+        for attempt in retry_policy.attempts():
             try:
-                with self.db_manager.get_cursor(dictionary=True) as cursor:
+                async with self.db_manager.get_cursor(dictionary=True) as cursor:
                     if permission > 1:
                         sql = "SELECT * FROM circulate WHERE username=%s ORDER BY borrow_time DESC"
-                        cursor.execute(sql, (username,))
+                        await cursor.execute(sql, (username,))
                     else:
                         sql = "SELECT * FROM circulate ORDER BY borrow_time DESC"
-                        cursor.execute(sql)
+                        await cursor.execute(sql)
 
-                    results = cursor.fetchall()
+                    results = await cursor.fetchall()
                     if not results:
                         return None
 
-                    return [
-                        BorrowInfo(
-                            id=row['id'],
-                            bookId=row['book_id'],
-                            borrowLong=row['borrow_long'],
-                            borrowTime=row['borrow_time'],
-                            isReturn=bool(row['is_return']),
-                            isTimeOut=bool(row['is_time_out']),
-                            returnTime=row['return_time'] if row['return_time'] else 0,
-                            username=row['username']
-                        )
-                        for row in results
-                    ]
+                    return [self._row_to_borrow_info(row) for row in results]
 
             except MySQLError as e:
-                print(f"获取借阅记录失败 (尝试 {attempt + 1}/{max_retries}): {e}")
-                if attempt == max_retries - 1:
+                print(f"获取借阅记录失败 (尝试 {attempt}): {e}")
+                if not await attempt.backoff_async(e):
                     return None
-                time.sleep(1)
             except Exception as e:
                 print(f"获取借阅记录未知错误: {e}")
                 return None
 
-    def search_books(self, keyword: str) -> Optional[List[BookDataBase]]:
-        """搜索图书"""
-        max_retries = 3
-        for attempt in range(max_retries):
+    @staticmethod
+    def _row_to_borrow_info(row: dict) -> BorrowInfo:
+        return BorrowInfo(
+            id=row['id'],
+            bookId=row['book_id'],
+            borrowLong=row['borrow_long'],
+            borrowTime=row['borrow_time'],
+            isReturn=bool(row['is_return']),
+            isTimeOut=bool(row['is_time_out']),
+            returnTime=row['return_time'] if row['return_time'] else 0,
+            username=row['username']
+        )
+
+    async def get_circulate_page(self, username: str, permission: int, cursor: Optional[str] = None,
+                                 limit: int = 20, is_return: Optional[bool] = None,
+                                 is_time_out: Optional[bool] = None, book_id: Optional[int] = None,
+                                 start_time: Optional[int] = None, end_time: Optional[int] = None,
+                                 filter_username: Optional[str] = None
+                                 ) -> Optional[Tuple[List[BorrowInfo], Optional[str]]]:
+        """按 (borrow_time, id) 倒序键集分页获取借阅记录
+
+        普通用户只能查看自己的记录；管理员（permission <= 1）可查看全部并按用户名过滤。
+        游标格式为 "borrow_time_id"，返回 (当前页数据, 下一页游标)，游标无效时抛出 ValueError。
+        """
+        conditions, params = [], []
+        if permission > 1:
+            conditions.append("username = %s")
+            params.append(username)
+        elif filter_username:
+            conditions.append("username = %s")
+            params.append(filter_username)
+        if book_id is not None:
+            conditions.append("book_id = %s")
+            params.append(book_id)
+        if is_return is not None:
+            conditions.append("is_return = %s")
+            params.append(int(is_return))
+        if is_time_out is not None:
+            conditions.append("is_time_out = %s")
+            params.append(int(is_time_out))
+        if start_time is not None:
+            conditions.append("borrow_time >= %s")
+            params.append(start_time)
+        if end_time is not None:
+            conditions.append("borrow_time < %s")
+            params.append(end_time)
+        if cursor:
+            cursor_time, _, cursor_id = cursor.partition("_")
+            cursor_time, cursor_id = int(cursor_time), int(cursor_id)
+            conditions.append("(borrow_time < %s OR (borrow_time = %s AND id < %s))")
+            params.extend([cursor_time, cursor_time, cursor_id])
+
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+        sql = f"SELECT * FROM circulate {where}ORDER BY borrow_time DESC, id DESC LIMIT %s"
+        params.append(limit + 1)
+
+        for attempt in retry_policy.attempts():
+            try:
+                async with self.db_manager.get_cursor(dictionary=True) as db_cursor:
+                    await db_cursor.execute(sql, tuple(params))
+                    rows = await db_cursor.fetchall()
+
+                next_cursor = None
+                if len(rows) > limit:
+                    rows = rows[:limit]
+                    next_cursor = f"{rows[-1]['borrow_time']}_{rows[-1]['id']}"
+                return [self._row_to_borrow_info(row) for row in rows], next_cursor
+
+            except MySQLError as e:
+                print(f"分页获取借阅记录失败 (尝试 {attempt}): {e}")
+                if not await attempt.backoff_async(e):
+                    return None
+            except Exception as e:
+                print(f"分页获取借阅记录未知错误: {e}")
+                return None
+
+    async def get_overdue_page(self, username: str, permission: int, cursor: Optional[str] = None,
+                               limit: int = 20, filter_username: Optional[str] = None
+                               ) -> Optional[Tuple[List[BorrowInfo], Optional[str]]]:
+        """分页获取当前逾期未归还的借阅记录（is_time_out 由 OverdueSweeper 后台维护）"""
+        return await self.get_circulate_page(username, permission, cursor, limit, is_return=False,
+                                             is_time_out=True, filter_username=filter_username)
+
+    async def search_books(self, keyword: str, page: int = 1,
+                           size: int = 20) -> Optional[Tuple[List[BookDataBase], bool]]:
+        """全文检索图书（FULLTEXT ngram 索引），按相关度排序分页
+
+        返回 (当前页图书, 是否还有下一页)。
+        """
+        for attempt in retry_policy.attempts():
             try:
-                # 使用字典游标
-                with self.db_manager.get_cursor(dictionary=True) as cursor:
+                async with self.db_manager.get_cursor(dictionary=True) as cursor:
                     sql = """
-                          SELECT * \
+                          SELECT *, MATCH(title, author, description) AGAINST(%s IN NATURAL LANGUAGE MODE) AS score
                           FROM books
-                          WHERE title LIKE %s
-                             OR author LIKE %s
-                             OR description LIKE %s \
+                          WHERE MATCH(title, author, description) AGAINST(%s IN NATURAL LANGUAGE MODE)
+                          ORDER BY score DESC, book_id
+                          LIMIT %s OFFSET %s \
                           """
-                    search_pattern = f"%{keyword}%"
-                    cursor.execute(sql, (search_pattern, search_pattern, search_pattern))
-                    results = cursor.fetchall()
-
-                    if not results:
-                        return None
+                    await cursor.execute(sql, (keyword, keyword, size + 1, (page - 1) * size))
+                    results = await cursor.fetchall()
 
-                    return [
+                    books = [
                         BookDataBase(
                             id=row['id'],
                             author=row['author'],
@@ -332,14 +514,86 @@ class Book:
                             title=row['title'],
                             type=row['type']
                         )
-                        for row in results
+                        for row in results[:size]
                     ]
+                    return books, len(results) > size
 
             except MySQLError as e:
-                print(f"搜索图书失败 (尝试 {attempt + 1}/{max_retries}): {e}")
-                if attempt == max_retries - 1:
+                print(f"搜索图书失败 (尝试 {attempt}): {e}")
+                if not await attempt.backoff_async(e):
                     return None
-                time.sleep(1)
             except Exception as e:
                 print(f"搜索图书未知错误: {e}")
-                return None
\ No newline at end of file
+                return None
+
+    async def suggest_titles(self, prefix: str, limit: int = 10) -> Optional[List[dict]]:
+        """按书名前缀补全，走 title 前缀索引"""
+        escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        for attempt in retry_policy.attempts():
+            try:
+                async with self.db_manager.get_cursor(dictionary=True) as cursor:
+                    sql = "SELECT book_id, title FROM books WHERE title LIKE %s ORDER BY title LIMIT %s"
+                    await cursor.execute(sql, (escaped + "%", limit))
+                    return list(await cursor.fetchall())
+
+            except MySQLError as e:
+                print(f"书名补全失败 (尝试 {attempt}): {e}")
+                if not await attempt.backoff_async(e):
+                    return None
+            except Exception as e:
+                print(f"书名补全未知错误: {e}")
+                return None
+
+
+class BorrowQueue:
+    """热门图书借阅准入队列：按 book_id 合并并发借阅请求，每批只对 books 行写一次"""
+    BATCH_WINDOW = 0.002
+    MAX_BATCH = 200
+
+    def __init__(self):
+        self.pending: dict[int, list[Tuple[int, str, asyncio.Future]]] = {}
+        self.draining: set[int] = set()
+        # 保留后台任务的引用，避免处理过程中被垃圾回收
+        self.tasks: set[asyncio.Task] = set()
+
+    async def submit(self, book_id: int, borrow_long: int, username: str) -> bool:
+        future = asyncio.get_running_loop().create_future()
+        self.pending.setdefault(book_id, []).append((borrow_long, username, future))
+        if book_id not in self.draining:
+            self.draining.add(book_id)
+            task = asyncio.create_task(self._drain(book_id))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+        return await future
+
+    async def _drain(self, book_id: int):
+        """持续处理该书的排队请求；上一批事务执行期间到达的请求会合并到下一批
+
+        组批前已取消的请求会被跳过；已进入批次的请求即使随后被取消，借阅仍会提交。
+        """
+        # 任务复制了首个请求的上下文，后续批次服务于其他请求，不受该请求的重试截止时间限制
+        request_deadline.set(None)
+        try:
+            await asyncio.sleep(self.BATCH_WINDOW)
+            while self.pending.get(book_id):
+                # 调用方已取消（如客户端断开）的请求不再借阅，避免提交了借阅却无人知晓结果
+                queue = [item for item in self.pending[book_id] if not item[2].cancelled()]
+                batch, self.pending[book_id] = queue[:self.MAX_BATCH], queue[self.MAX_BATCH:]
+                if not batch:
+                    continue
+                try:
+                    results = await Book(book_id).borrow_batch([(b, u) for b, u, _ in batch])
+                except Exception as e:
+                    print(f"借阅队列处理失败: {e}")
+                    results = [False] * len(batch)
+                for (_, _, future), ok in zip(batch, results):
+                    if not future.done():
+                        future.set_result(ok)
+        finally:
+            for _, _, future in self.pending.pop(book_id, []):
+                if not future.done():
+                    future.set_result(False)
+            self.draining.discard(book_id)
+
+
+borrow_queue = BorrowQueue()
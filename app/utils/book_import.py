@@ -0,0 +1,161 @@
+import codecs
+import csv
+import json
+import os
+import uuid
+from typing import AsyncIterator, Optional, Tuple
+
+from pydantic import ValidationError
+from redis import RedisError
+
+from app.schemas.book import AddBookRequest, ImportBooksResult, ImportRowError
+from . import r
+from .book import Book
+
+
+class BookImporter:
+    """流式导入 CSV / JSON Lines 图书目录，逐行校验并按批次写入，内存占用与文件大小无关"""
+    FORMATS = ("csv", "jsonl")
+    BATCH_SIZE = int(os.environ.get("BOOK_IMPORT_BATCH_SIZE", 1000))
+    MAX_LINE_LENGTH = 1024 * 1024
+    MAX_REPORTED_ERRORS = 100
+    PROGRESS_KEY_PREFIX = "book_import:"
+    PROGRESS_TTL = 24 * 60 * 60
+    CSV_FIELDS = tuple(AddBookRequest.model_fields)
+
+    def __init__(self, fmt: str, import_id: Optional[str] = None, batch_size: int = None):
+        if fmt not in self.FORMATS:
+            raise ValueError(f"不支持的导入格式: {fmt}")
+        self.format = fmt
+        self.batch_size = batch_size or self.BATCH_SIZE
+        self.result = ImportBooksResult(importId=import_id or uuid.uuid4().hex)
+
+    async def _iter_lines(self, chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, str]]:
+        """把字节流切分为 (行号, 行内容)，只缓存当前未结束的一行"""
+        decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+        pending = ""
+        line_no = 0
+        async for chunk in chunks:
+            pending += decoder.decode(chunk)
+            *lines, pending = pending.split("\n")
+            for line in lines:
+                line_no += 1
+                yield line_no, line.rstrip("\r")
+            if len(pending) > self.MAX_LINE_LENGTH:
+                raise ValueError(f"第 {line_no + 1} 行超过长度限制")
+        pending += decoder.decode(b"", final=True)
+        if pending:
+            yield line_no + 1, pending.rstrip("\r")
+
+    async def _iter_records(self, chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, dict | str]]:
+        """产出 (起始行号, 原始记录)，解析失败时记录为错误信息字符串"""
+        if self.format == "jsonl":
+            async for line_no, line in self._iter_lines(chunks):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield line_no, f"JSON 解析失败: {e.msg}"
+                    continue
+                yield line_no, record if isinstance(record, dict) else "每行必须是 JSON 对象"
+            return
+
+        header = None
+        buffer, start = [], 0
+        async for line_no, line in self._iter_lines(chunks):
+            if not buffer:
+                if not line.strip():
+                    continue
+                start = line_no
+            buffer.append(line)
+            # 引号未闭合说明字段内含换行，继续拼接下一行
+            text = "\n".join(buffer)
+            if text.count('"') % 2:
+                if len(text) > self.MAX_LINE_LENGTH:
+                    raise ValueError(f"第 {start} 行起的记录超过长度限制")
+                continue
+            buffer = []
+
+            row = next(csv.reader([text]))
+            if header is None:
+                header = [name.strip() for name in row]
+                missing = [name for name in self.CSV_FIELDS if name not in header]
+                if missing:
+                    raise ValueError(f"CSV 表头缺少字段: {', '.join(missing)}")
+                continue
+            if len(row) != len(header):
+                yield start, f"字段数量应为 {len(header)}，实际为 {len(row)}"
+                continue
+            yield start, dict(zip(header, row))
+
+        if buffer:
+            yield start, "引号未闭合"
+
+    def _record_error(self, line: int, error: str):
+        self.result.failed += 1
+        if len(self.result.errors) < self.MAX_REPORTED_ERRORS:
+            self.result.errors.append(ImportRowError(line=line, error=error))
+
+    async def _save_progress(self):
+        try:
+            await r.set_async(self.PROGRESS_KEY_PREFIX + self.result.importId, self.result.model_dump_json(), self.PROGRESS_TTL)
+        except RedisError as e:
+            print(f"保存导入进度失败: {e}")
+
+    @classmethod
+    async def get_progress(cls, import_id: str) -> Optional[ImportBooksResult]:
+        raw = await r.get_async(cls.PROGRESS_KEY_PREFIX + import_id)
+        return ImportBooksResult.model_validate_json(raw) if raw else None
+
+    async def _flush(self, batch: list[AddBookRequest], lines: list[int]):
+        result = await Book().add_book(batch, chunk_size=self.batch_size)
+        if result is None:
+            for line in lines:
+                self._record_error(line, "写入数据库失败")
+        else:
+            self.result.inserted += result.inserted
+            self.result.batches.append(result.inserted)
+        await self._save_progress()
+
+    async def run(self, chunks: AsyncIterator[bytes]) -> ImportBooksResult:
+        batch: list[AddBookRequest] = []
+        lines: list[int] = []
+        await self._save_progress()
+        try:
+            async for line, record in self._iter_records(chunks):
+                self.result.processed += 1
+                if isinstance(record, str):
+                    self._record_error(line, record)
+                    continue
+                try:
+                    batch.append(AddBookRequest.model_validate(record))
+                    lines.append(line)
+                except ValidationError as e:
+                    self._record_error(line, "; ".join(
+                        f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()
+                    ))
+                    continue
+                if len(batch) >= self.batch_size:
+                    await self._flush(batch, lines)
+                    batch, lines = [], []
+            if batch:
+                await self._flush(batch, lines)
+        except ValueError as e:
+            self.result.aborted = str(e)
+
+        self.result.finished = True
+        await self._save_progress()
+        return self.result
+
+    @staticmethod
+    def detect_format(content_type: str, fmt: Optional[str]) -> Optional[str]:
+        if fmt:
+            return fmt
+        content_type = (content_type or "").split(";")[0].strip().lower()
+        if content_type in ("text/csv", "application/csv"):
+            return "csv"
+        if content_type in ("application/x-ndjson", "application/jsonl", "application/x-jsonlines"):
+            return "jsonl"
+        return None
+
@@ -0,0 +1,115 @@
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional, Type
+
+from .retry import is_transient
+
+# 当前请求内被熔断拒绝的依赖，由 LoadShedMiddleware 初始化并据此返回 503
+unavailable_dependencies: ContextVar[Optional[list]] = ContextVar("unavailable_dependencies", default=None)
+
+
+def mark_unavailable(name: str, retry_after: int):
+    """记录当前请求有关键依赖不可用，LoadShedMiddleware 据此返回 503"""
+    rejected = unavailable_dependencies.get()
+    if rejected is not None:
+        rejected.append((name, retry_after))
+
+
+class CircuitOpenError(Exception):
+    """依赖处于熔断状态，调用被直接拒绝"""
+
+
+class CircuitBreaker:
+    """熔断器：连续暂时性错误达到阈值后打开，冷却期内直接拒绝调用；
+    冷却结束进入半开状态，放行少量探测请求，成功则关闭，失败则重新打开。线程安全。
+
+    critical=True 的依赖被拒绝时记入 unavailable_dependencies，整个请求返回 503；
+    调用方本身可以降级的依赖（如缓存）应设为 False。
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    FAILURE_THRESHOLD = int(os.environ.get("CIRCUIT_FAILURE_THRESHOLD", 5))
+    RESET_TIMEOUT = float(os.environ.get("CIRCUIT_RESET_TIMEOUT", 10))
+    HALF_OPEN_MAX = int(os.environ.get("CIRCUIT_HALF_OPEN_MAX", 1))
+
+    def __init__(self, name: str, error_class: Type[Exception] = CircuitOpenError, critical: bool = True):
+        self.name = name
+        self.error_class = error_class
+        self.critical = critical
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probes = 0
+        self._lock = threading.Lock()
+
+    def retry_after(self) -> int:
+        """距离进入半开状态的剩余秒数"""
+        return max(1, round(self.RESET_TIMEOUT - (time.monotonic() - self.opened_at)))
+
+    def before_call(self):
+        """调用依赖前执行，熔断时抛出 error_class"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.RESET_TIMEOUT:
+                    self._reject()
+                self.state = self.HALF_OPEN
+                self.probes = 0
+            if self.state == self.HALF_OPEN:
+                if self.probes >= self.HALF_OPEN_MAX:
+                    self._reject()
+                self.probes += 1
+
+    def _reject(self):
+        if self.critical:
+            mark_unavailable(self.name, self.retry_after())
+        raise self.error_class(f"{self.name} 已熔断，{self.retry_after()} 秒后重试")
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            if self.state != self.CLOSED:
+                self.state = self.CLOSED
+                print(f"{self.name} 熔断器已关闭")
+
+    def release_probe(self):
+        """调用在到达依赖之前就失败（如本地连接池耗尽）时执行：归还 before_call 占用的半开探测名额，不计成败"""
+        with self._lock:
+            if self.state == self.HALF_OPEN and self.probes > 0:
+                self.probes -= 1
+
+    def record_failure(self, error: BaseException):
+        """只统计暂时性错误；永久性错误说明依赖本身可用"""
+        if not is_transient(error):
+            self.record_success()
+            return
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.FAILURE_THRESHOLD:
+                if self.state != self.OPEN:
+                    print(f"{self.name} 熔断器已打开: {error}")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class ConcurrencyLimiter:
+    """并发上限：超出时立即拒绝而不是排队等待。线程安全。"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self.in_flight >= self.limit:
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
@@ -0,0 +1,203 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional, Tuple
+
+from fastapi import Request
+from pydantic import BaseModel
+from redis import RedisError
+from starlette.responses import Response
+
+from app.schemas.user import UserInfo
+
+
+class TTLCache:
+    """带过期时间的有界 LRU 缓存（线程安全）"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expire_at = item
+            if expire_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        expire_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expire_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class UserCache:
+    """已认证用户信息缓存：进程内 LRU + Redis 二级缓存"""
+    KEY_PREFIX = "user_info:"
+    LOCAL_TTL = 5
+    LOCAL_MAXSIZE = 10000
+    REDIS_TTL = 5 * 60
+
+    def __init__(self, redis_client):
+        self.r = redis_client
+        self.local = TTLCache(self.LOCAL_MAXSIZE, self.LOCAL_TTL)
+
+    def _decode(self, username: str, raw: Optional[str]) -> Optional[UserInfo]:
+        if not raw:
+            return None
+        user = UserInfo.model_validate_json(raw)
+        self.local.set(username, user)
+        return user
+
+    def get(self, username: str) -> Optional[UserInfo]:
+        """读取缓存，未命中返回 None"""
+        user = self.local.get(username)
+        if user is not None:
+            return user
+
+        try:
+            raw = self.r.get(self.KEY_PREFIX + username)
+        except RedisError as e:
+            print(f"读取用户缓存失败: {e}")
+            return None
+        return self._decode(username, raw)
+
+    async def get_async(self, username: str) -> Optional[UserInfo]:
+        """get 的异步版本，供异步请求处理使用"""
+        user = self.local.get(username)
+        if user is not None:
+            return user
+
+        try:
+            raw = await self.r.get_async(self.KEY_PREFIX + username)
+        except RedisError as e:
+            print(f"读取用户缓存失败: {e}")
+            return None
+        return self._decode(username, raw)
+
+    async def get_with(self, username: str, *commands) -> Tuple[Optional[UserInfo], list]:
+        """读取缓存，并在同一次 Redis 往返中执行 commands，返回 (用户信息, commands 的结果)
+
+        进程内命中时只执行 commands；Redis 出错时抛出 RedisError，由调用方决定如何降级。
+        """
+        user = self.local.get(username)
+        if user is None:
+            commands = (("get", self.KEY_PREFIX + username),) + commands
+        results = await self.r.pipeline_async(*commands)
+        if user is None:
+            user = self._decode(username, results.pop(0))
+        return user, results
+
+    def set(self, user: UserInfo):
+        """写入缓存"""
+        self.local.set(user.username, user)
+        try:
+            self.r.set(self.KEY_PREFIX + user.username, user.model_dump_json(), self.REDIS_TTL)
+        except RedisError as e:
+            print(f"写入用户缓存失败: {e}")
+
+    async def set_async(self, user: UserInfo):
+        """set 的异步版本，供异步请求处理使用"""
+        self.local.set(user.username, user)
+        try:
+            await self.r.set_async(self.KEY_PREFIX + user.username, user.model_dump_json(), self.REDIS_TTL)
+        except RedisError as e:
+            print(f"写入用户缓存失败: {e}")
+
+    def invalidate(self, username: str):
+        """用户数据变更后使缓存失效"""
+        self.local.delete(username)
+        try:
+            self.r.delete(self.KEY_PREFIX + username)
+        except RedisError as e:
+            print(f"删除用户缓存失败: {e}")
+
+
+class CatalogueCache:
+    """图书目录读缓存：以版本号为键保存序列化后的响应体，写操作递增版本号使其失效"""
+    VERSION_KEY = "books:catalogue_version"
+    VERSION_TTL = 1
+    LOCAL_TTL = 10 * 60
+    LOCAL_MAXSIZE = 1024
+
+    def __init__(self, redis_client):
+        self.r = redis_client
+        self.local = TTLCache(self.LOCAL_MAXSIZE, self.LOCAL_TTL)
+        self._version: Optional[int] = None
+        self._version_checked_at = 0.0
+
+    async def version(self) -> int:
+        """当前目录版本，进程内最多缓存 VERSION_TTL 秒"""
+        now = time.monotonic()
+        if self._version is not None and now - self._version_checked_at < self.VERSION_TTL:
+            return self._version
+        try:
+            self._version = int(await self.r.get_async(self.VERSION_KEY) or 0)
+            self._version_checked_at = now
+        except RedisError as e:
+            print(f"读取目录版本失败: {e}")
+            # Redis 不可用时无法感知其他进程的写入，退化为不使用缓存
+            return -1
+        return self._version
+
+    async def bump(self):
+        """图书数据发生变化后调用"""
+        try:
+            self._version = int(await self.r.incr_async(self.VERSION_KEY))
+            self._version_checked_at = time.monotonic()
+        except RedisError as e:
+            print(f"更新目录版本失败: {e}")
+            self._version = None
+        self.local.clear()
+
+    @staticmethod
+    def _etag(version: int, key: Hashable) -> str:
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()[:16]
+        return f'W/"{version}-{digest}"'
+
+    async def respond(self, request: Request, key: Hashable,
+                      build: Callable[[], Awaitable[BaseModel]]) -> Response:
+        """返回缓存的响应体；客户端 ETag 未过期时直接返回 304
+
+        只缓存 code == 0 的成功响应，查询失败等错误响应原样返回，不缓存也不带 ETag。
+        """
+        version = await self.version()
+        if version < 0:
+            return Response((await build()).model_dump_json(), media_type="application/json")
+
+        etag = self._etag(version, key)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers=headers)
+
+        body = self.local.get((version, key))
+        if body is None:
+            result = await build()
+            if getattr(result, "code", 0) != 0:
+                return Response(result.model_dump_json(), media_type="application/json")
+            body = result.model_dump_json().encode()
+            self.local.set((version, key), body)
+        return Response(body, media_type="application/json", headers=headers)
@@ -1,3 +1,4 @@
+import inspect
 from functools import wraps
 
 from fastapi import HTTPException
@@ -5,49 +6,69 @@ from fastapi import HTTPException
 from app.schemas.common import ResponseNormal, DataResponse
 
 
-def handle_response(func):
+def _wrap(func, before=None, after=None):
+    """按被装饰函数是否为协程生成同步或异步包装器"""
+    if inspect.iscoroutinefunction(func):
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            if before:
+                early = before(kwargs)
+                if early is not None:
+                    return early
+            result = await func(*args, **kwargs)
+            return after(result) if after else result
+
+        return async_wrapper
+
     @wraps(func)
     def wrapper(*args, **kwargs):
+        if before:
+            early = before(kwargs)
+            if early is not None:
+                return early
         result = func(*args, **kwargs)
+        return after(result) if after else result
 
-        if isinstance(result, (ResponseNormal, DataResponse)):
-            return result
+    return wrapper
 
-        if result is True:
-            return ResponseNormal(msg="操作成功")
 
-        if result in (False, None):
-            return ResponseNormal(msg="操作失败", code=1)
+def _normalize_response(result):
+    if isinstance(result, (ResponseNormal, DataResponse)):
+        return result
 
-        return DataResponse(msg="操作成功", data=result)
+    if result is True:
+        return ResponseNormal(msg="操作成功")
 
-    return wrapper
+    if result in (False, None):
+        return ResponseNormal(msg="操作失败", code=1)
+
+    return DataResponse(msg="操作成功", data=result)
+
+
+def handle_response(func):
+    return _wrap(func, after=_normalize_response)
 
 
 def require_permission(level: int = 1):
     def decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
+        def check(kwargs):
             user = kwargs.get("user")
             if user.permission > level:
                 raise HTTPException(status_code=403, detail="权限不足")
-            return func(*args, **kwargs)
 
-        return wrapper
+        return _wrap(func, before=check)
 
     return decorator
 
 
 def match_username(param_name: str = "username"):
     def decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
+        def check(kwargs):
             user = kwargs.get("user")
             username = kwargs.get(param_name)
             if username and user and username != user.username:
                 return ResponseNormal(msg="用户名不匹配", code=1)
-            return func(*args, **kwargs)
 
-        return wrapper
+        return _wrap(func, before=check)
 
     return decorator
@@ -1,24 +1,18 @@
-import os
 import secrets
-import smtplib
 import string
-from email.header import Header
-from email.mime.text import MIMEText
 from typing import Optional, Dict
 
 from mysql.connector import Error as MySQLError
+from redis import RedisError
 
 from app.schemas.common import *
 from app.schemas.common import ResponseNormal
-from . import db_manager
+from . import db_manager, email_token_store, user_cache
+from .outbox import email_outbox
+from .retry import retry_policy
 
 
 class Email:
-    __smtp_server: str = os.environ.get("EMAIL_HOST")
-    __smtp_port: int = int(os.environ.get("EMAIL_PORT", 465))
-    __sender_email: str = os.environ.get("EMAIL_USER")
-    __password: str = os.environ.get("EMAIL_PASSWORD")
-
     def __init__(self, username: str = None, email: str = None, token: str = None):
         self.username: Optional[str] = username
         self.email: Optional[str] = email
@@ -34,33 +28,12 @@ class Email:
         self.token = ''.join(secrets.choice(chars) for _ in range(32))
         return self.token
 
-    def save_token_to_db(self) -> bool:
-        """将 token 保存到数据库"""
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                with self.db_manager.get_cursor() as cursor:
-                    sql = """
-                          UPDATE users
-                          SET email_verification_token = %s, \
-                              email_verified           = %s
-                          WHERE username = %s \
-                          """
-                    cursor.execute(sql, (self.token, 0, self.username))
-                    return True
-
-            except MySQLError as e:
-                print(f"保存 token 失败 (尝试 {attempt + 1}/{max_retries}): {e}")
-                if attempt == max_retries - 1:
-                    return False
-                continue
-            except Exception as e:
-                print(f"未知错误: {e}")
-                return False
-        return False
+    def save_token(self) -> bool:
+        """保存 token 到 Redis，按 TTL 自动过期，同一用户的旧 token 随之失效"""
+        return email_token_store.issue(self.username, self.email, self.token)
 
-    def send_email(self) -> bool:
-        """发送验证邮件"""
+    def build_verification_email(self) -> tuple[str, str]:
+        """生成验证邮件的标题与 HTML 正文"""
         if not self.token:
             raise ValueError("Token 未生成，请先调用 generate_token()")
 
@@ -71,43 +44,25 @@ class Email:
             f"<p>请点击以下链接完成邮箱验证：</p>"
             f"<a href='{link}'>{link}</a>"
             f"<p>如果无法点击，请复制链接到浏览器打开。</p>"
-            f"<p>此链接有效期为24小时。</p>"
+            f"<p>此链接有效期为{email_token_store.ttl // 3600}小时。</p>"
         )
+        return subject, html_content
 
-        message = MIMEText(html_content, "html", "utf-8")
-        message["From"] = f"图书管理系统 <{self.__sender_email}>"
-        message["To"] = self.email
-        message["Subject"] = Header(subject, "utf-8")
-
-        max_retries = 2
-        for attempt in range(max_retries):
-            try:
-                with smtplib.SMTP_SSL(self.__smtp_server, self.__smtp_port) as server:
-                    server.login(self.__sender_email, self.__password)
-                    server.sendmail(self.__sender_email, self.email, message.as_string())
-                    print(f"邮件发送成功！收件人: {self.email}")
-                    return True
-
-            except smtplib.SMTPException as e:
-                print(f"邮件发送失败 (尝试 {attempt + 1}/{max_retries}): {e}")
-                if attempt == max_retries - 1:
-                    return False
-                continue
-            except Exception as e:
-                print(f"邮件发送未知错误: {e}")
-                return False
-        return False
+    def send_email(self, cursor=None) -> bool:
+        """将验证邮件写入发件箱，由后台任务发送；传入 cursor 时在调用方的事务内写入"""
+        subject, html_content = self.build_verification_email()
+        return email_outbox.enqueue(self.email, subject, html_content, cursor)
 
     def send_verification_email(self) -> ResponseNormal:
         """发送验证邮件的完整流程"""
         try:
             self.generate_token()
 
-            if not self.save_token_to_db():
+            if not self.save_token():
                 return ResponseNormal(msg="保存验证信息失败", code=1)
 
             if self.send_email():
-                return ResponseNormal(msg="验证邮件发送成功")
+                return ResponseNormal(msg="验证邮件已加入发送队列")
             else:
                 return ResponseNormal(msg="邮件发送失败", code=1)
 
@@ -116,86 +71,89 @@ class Email:
             return ResponseNormal(msg="系统错误，请稍后重试", code=1)
 
     def resend_email(self) -> ResponseNormal | None:
-        """重新发送验证邮件"""
-        max_retries = 3
-        for attempt in range(max_retries):
+        """重新发送验证邮件：签发新 token（旧 token 作废），按用户限流"""
+        for attempt in retry_policy.attempts():
             try:
                 with self.db_manager.get_cursor(dictionary=True) as cursor:
-                    sql = "SELECT email_verification_token, email FROM users WHERE username=%s"
+                    sql = "SELECT email, email_verified FROM users WHERE username=%s"
                     cursor.execute(sql, (self.username,))
                     result = cursor.fetchone()
 
                     if not result:
                         return ResponseNormal(msg="用户不存在", code=1)
 
-                    if not result['email_verification_token'] or not result['email']:
+                    if result['email_verified'] == 1:
+                        return ResponseNormal(msg="邮箱已验证", code=1)
+
+                    if not result['email']:
                         return ResponseNormal(msg="用户信息不完整", code=1)
 
-                    self.token = result['email_verification_token']
+                    wait = email_token_store.throttle(self.username)
+                    if wait:
+                        return ResponseNormal(msg=f"发送过于频繁，请 {wait} 秒后重试", code=1)
+
                     self.email = result['email']
+                    self.generate_token()
+                    if not self.save_token():
+                        return ResponseNormal(msg="保存验证信息失败", code=1)
 
-                    if self.send_email():
-                        return ResponseNormal(msg="邮件发送成功")
+                    if self.send_email(cursor):
+                        return ResponseNormal(msg="验证邮件已加入发送队列")
                     else:
                         return ResponseNormal(msg="邮件发送失败", code=1)
 
             except MySQLError as e:
-                print(f"重新发送邮件失败 (尝试 {attempt + 1}/{max_retries}): {e}")
-                if attempt == max_retries - 1:
+                print(f"重新发送邮件失败 (尝试 {attempt}): {e}")
+                if not attempt.backoff(e):
                     return ResponseNormal(msg="数据库错误", code=1)
-                continue
             except Exception as e:
                 print(f"重新发送邮件未知错误: {e}")
                 return ResponseNormal(msg="系统错误", code=1)
 
     def verify_email(self, token: str) -> Optional[Dict[str, str]]:
-        """验证邮箱 token"""
-        max_retries = 3
-        for attempt in range(max_retries):
+        """验证邮箱 token：Redis 中一次查询得到用户，更新按用户名主键进行"""
+        try:
+            data = email_token_store.lookup(token)
+        except RedisError as e:
+            print(f"读取验证 token 失败: {e}")
+            return None
+        if not data:
+            return None
+        username = data['username']
+
+        for attempt in retry_policy.attempts():
             try:
                 with self.db_manager.get_cursor(dictionary=True) as cursor:
-                    sql = """
-                          SELECT username, email, email_verified
-                          FROM users
-                          WHERE email_verification_token = %s \
-                          """
-                    cursor.execute(sql, (token,))
-                    result = cursor.fetchone()
-
-                    if not result:
-                        return None
-
-                    username = result['username']
-                    email = result['email']
-                    email_verified = result['email_verified']
-
-                    if email_verified == 1:
-                        return None
-
                     update_sql = """
                                  UPDATE users
                                  SET email_verification_token = NULL,
                                      email_verified           = %s,
                                      permission               = %s
-                                 WHERE username = %s \
+                                 WHERE username = %s
+                                   AND email_verified = 0 \
                                  """
                     cursor.execute(update_sql, (1, 3, username))
+                    if cursor.rowcount == 0:
+                        return None
+                    user_cache.invalidate(username)
 
-                    return {"username": username, "email": email}
+                try:
+                    email_token_store.revoke(token, username)
+                except RedisError as e:
+                    print(f"作废验证 token 失败: {e}")
+                return {"username": username, "email": data['email']}
 
             except MySQLError as e:
-                print(f"邮箱验证失败 (尝试 {attempt + 1}/{max_retries}): {e}")
-                if attempt == max_retries - 1:
+                print(f"邮箱验证失败 (尝试 {attempt}): {e}")
+                if not attempt.backoff(e):
                     return None
-                continue
             except Exception as e:
                 print(f"邮箱验证未知错误: {e}")
                 return None
 
     def check_email_verified(self, username: str) -> bool | None | Any:
         """检查邮箱是否已验证"""
-        max_retries = 2
-        for attempt in range(max_retries):
+        for attempt in retry_policy.attempts(2):
             try:
                 with self.db_manager.get_cursor(dictionary=True) as cursor:
                     sql = "SELECT email_verified FROM users WHERE username = %s"
@@ -205,10 +163,9 @@ class Email:
                     return result and result['email_verified'] == 1
 
             except MySQLError as e:
-                print(f"检查邮箱验证状态失败 (尝试 {attempt + 1}/{max_retries}): {e}")
-                if attempt == max_retries - 1:
+                print(f"检查邮箱验证状态失败 (尝试 {attempt}): {e}")
+                if not attempt.backoff(e):
                     return False
-                continue
             except Exception as e:
                 print(f"检查邮箱验证状态未知错误: {e}")
                 return False
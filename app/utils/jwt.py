@@ -1,3 +1,4 @@
+import hashlib
 import time
 import uuid
 from typing import Optional, Dict
@@ -5,6 +6,7 @@ from typing import Optional, Dict
 from jose import jwt
 from jose.exceptions import JWTError
 
+from .cache import TTLCache
 from .config import Config
 
 
@@ -13,14 +15,18 @@ class JWT:
     __ISS: str = "Luomuyu"
     __SECRET: bytes = Config().get_private_key().encode()
     __ALGO: str = "HS256"
+    __CACHE_MAXSIZE: int = 10000
+    __cache: TTLCache = TTLCache(__CACHE_MAXSIZE, __ACCESS_EXPIRE)
+    cache_hits: int = 0
+    cache_misses: int = 0
 
     @classmethod
-    def gen_access_token(cls, username: str, expire_seconds: int = None) -> str:
+    def gen_access_token(cls, username: str, expire_seconds: int = None, session_id: str = None) -> str:
         now = int(time.time())
         expire = now + (expire_seconds if expire_seconds is not None else cls.__ACCESS_EXPIRE)
 
         payload: Dict[str, str | int] = {
-            "sub": str(uuid.uuid4()),
+            "sub": session_id or str(uuid.uuid4()),
             "name": username,
             "iss": cls.__ISS,
             "iat": now,
@@ -31,11 +37,41 @@ class JWT:
 
     @classmethod
     def parse_claim(cls, token: str) -> Optional[Dict]:
+        if not token:
+            return None
+
+        key = hashlib.sha256(token.encode()).digest()
+        claims = cls.__cache.get(key)
+        if claims is not None:
+            cls.cache_hits += 1
+            return claims
+
+        cls.cache_misses += 1
         try:
-            return jwt.decode(token, cls.__SECRET, algorithms=[cls.__ALGO])
+            claims = jwt.decode(token, cls.__SECRET, algorithms=[cls.__ALGO])
         except JWTError:
             return None
 
+        ttl = claims.get("exp", 0) - time.time()
+        if ttl > 0:
+            cls.__cache.set(key, claims, ttl)
+        return claims
+
+    @classmethod
+    def cache_stats(cls) -> Dict[str, int]:
+        """已验证 token 缓存的命中统计"""
+        return {
+            "hits": cls.cache_hits,
+            "misses": cls.cache_misses,
+            "size": len(cls.__cache),
+        }
+
+    @classmethod
+    def clear_cache(cls):
+        cls.__cache.clear()
+        cls.cache_hits = 0
+        cls.cache_misses = 0
+
     @classmethod
     def get_username(cls, token: str) -> Optional[str]:
         claims = cls.parse_claim(token)
@@ -1,67 +1,110 @@
-from typing import Optional
+import asyncio
+from typing import Optional, Set
 
-from mysql.connector import Error as MySQLError
+from aiomysql import MySQLError
 
 from app.schemas.user import UserInfo
-from . import db_manager
+from . import async_db_manager, user_cache
+from .breaker import unavailable_dependencies
 from .password import PasswordEncryption
 from .rsa import RSA
-from .user import User
+from .retry import request_deadline, retry_policy
 
 
 class Login:
+    _upgrades: Set[asyncio.Task] = set()
+
     def __init__(self, username: str, password: str):
         self.username: str = username
         self.password: str = password
-        self.db_manager = db_manager
+        self.db_manager = async_db_manager
 
-    def login(self) -> Optional[UserInfo]:
+    async def login(self) -> Optional[UserInfo]:
         """用户登录验证"""
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                with self.db_manager.get_cursor(dictionary=True) as cursor:
-                    sql = "SELECT username, password, salt FROM users WHERE username = %s"
-                    cursor.execute(sql, (self.username,))
-                    result = cursor.fetchone()
+        result = await self._select_credentials()
+        if not result:
+            return None
 
-                    if not result:
-                        return None
+        decrypted_password = await self._verify_password(result)
+        if decrypted_password is None:
+            return None
+        if PasswordEncryption.needs_rehash(result['password']):
+            self._schedule_upgrade(decrypted_password, result['password'])
 
-                    is_valid = self._verify_password(result)
-                    if not is_valid:
-                        return None
+        user_info = UserInfo(
+            username=result['username'],
+            email=result['email'],
+            permission=result['permission'],
+            phone=str(result['phone'])
+        )
+        await user_cache.set_async(user_info)
+        return user_info
 
-                    user_info = User(self.username).select_by_username()
-                    return user_info
+    async def _select_credentials(self) -> Optional[dict]:
+        """一次查询取回校验密码和构造 UserInfo 所需的全部字段"""
+        for attempt in retry_policy.attempts():
+            try:
+                async with self.db_manager.get_cursor(dictionary=True) as cursor:
+                    sql = """
+                          SELECT username, password, salt, email, permission, phone
+                          FROM users
+                          WHERE username = %s \
+                          """
+                    await cursor.execute(sql, (self.username,))
+                    return await cursor.fetchone()
 
             except MySQLError as e:
-                print(f"登录查询失败 (尝试 {attempt + 1}/{max_retries}): {e}")
-                if attempt == max_retries - 1:
+                print(f"登录查询失败 (尝试 {attempt}): {e}")
+                if not await attempt.backoff_async(e):
                     # self._log_login_attempt(success=False, error=str(e))
                     raise e
-                continue
             except Exception as e:
                 print(f"登录过程未知错误: {e}")
                 # self._log_login_attempt(success=False, error=str(e))
                 raise e
 
-    def _verify_password(self, user_data: dict) -> bool:
-        """验证密码"""
+    async def _verify_password(self, user_data: dict) -> Optional[str]:
+        """验证密码，成功时返回解密后的明文供升级哈希使用"""
         try:
             db_password = user_data['password']
             db_salt = user_data['salt']
 
-            decrypted_password = RSA().decrypt_by_private(self.password)
+            decrypted_password = await RSA().decrypt_by_private_async(self.password)
             if not decrypted_password:
-                return False
+                return None
 
-            hashed_password = PasswordEncryption.hash_password(decrypted_password, db_salt)
-            return hashed_password == db_password
+            if not await PasswordEncryption.verify_async(decrypted_password, db_password, db_salt):
+                return None
+            return decrypted_password
 
         except Exception as e:
             print(f"密码验证失败: {e}")
-            return False
+            return None
+
+    def _schedule_upgrade(self, password: str, old_hash: str):
+        """在后台升级哈希，不增加登录延迟；保留任务引用直到完成，避免被垃圾回收"""
+        task = asyncio.create_task(self._upgrade_password_hash(password, old_hash))
+        Login._upgrades.add(task)
+        task.add_done_callback(Login._upgrades.discard)
+
+    async def _upgrade_password_hash(self, password: str, old_hash: str):
+        """登录成功后把旧格式或旧参数的哈希升级为当前格式；失败只记录日志，下次登录再试"""
+        # 任务复制了登录请求的上下文，清空后哈希队列已满或数据库熔断都不会把已成功的登录改成 503
+        unavailable_dependencies.set(None)
+        request_deadline.set(None)
+        try:
+            new_hash, salt = await PasswordEncryption.hash_async(password, critical=False)
+            async with self.db_manager.get_cursor() as cursor:
+                # 以旧哈希为条件，避免覆盖并发修改的密码
+                await cursor.execute("""
+                               UPDATE users
+                               SET password = %s,
+                                   salt     = %s
+                               WHERE username = %s
+                                 AND password = %s
+                               """, (new_hash, salt, self.username, old_hash))
+        except Exception as e:
+            print(f"升级密码哈希失败: {e}")
 
     '''
     def _log_login_attempt(self, success: bool, error: str = None):
@@ -78,7 +121,7 @@ class Login:
     '''
 
     @classmethod
-    def validate_user_credentials(cls, username: str, password: str) -> Optional[UserInfo]:
+    async def validate_user_credentials(cls, username: str, password: str) -> Optional[UserInfo]:
         """静态方法：验证用户凭据"""
         login = cls(username, password)
-        return login.login()
+        return await login.login()
@@ -1,13 +1,21 @@
 from mysql.connector import pooling
 from mysql.connector import Error as MySQLError
+from mysql.connector.errors import PoolError
 from contextlib import contextmanager
 from typing import Generator
 import os
 
+from .breaker import CircuitBreaker, CircuitOpenError
+
+
+class DatabaseUnavailableError(CircuitOpenError, MySQLError):
+    """MySQL 熔断中"""
+
 
 class DatabaseManager:
     def __init__(self):
         self.connection_pool = None
+        self.breaker = CircuitBreaker("MySQL", DatabaseUnavailableError)
         self._init_connection_pool()
 
     def _init_connection_pool(self):
@@ -34,17 +42,32 @@ class DatabaseManager:
 
     @contextmanager
     def get_connection(self) -> Generator:
-        """获取数据库连接的上下文管理器"""
-        connection = None
+        """获取数据库连接的上下文管理器；熔断时直接抛出 DatabaseUnavailableError"""
+        self.breaker.before_call()
         try:
             connection = self.connection_pool.get_connection()
-            yield connection
+        except PoolError as e:
+            # 本地连接池耗尽只说明并发超过 pool_size，MySQL 本身可用：不计入熔断，仍可由调用方重试
+            self.breaker.release_probe()
+            print(f"获取数据库连接失败: {e}")
+            raise
         except MySQLError as e:
+            self.breaker.record_failure(e)
             print(f"获取数据库连接失败: {e}")
             raise
+
+        failed = False
+        try:
+            yield connection
+        except MySQLError as e:
+            failed = True
+            self.breaker.record_failure(e)
+            print(f"数据库操作失败: {e}")
+            raise
         finally:
-            if connection:
-                connection.close()
+            if not failed:
+                self.breaker.record_success()
+            connection.close()
 
     @contextmanager
     def get_cursor(self, dictionary: bool = True) -> Generator:
@@ -57,3 +80,18 @@ class DatabaseManager:
             finally:
                 if cursor:
                     cursor.close()
+
+    @contextmanager
+    def transaction(self, dictionary: bool = True) -> Generator:
+        """在单个事务中执行的游标上下文管理器：正常退出时提交，异常时回滚"""
+        with self.get_connection() as connection:
+            cursor = connection.cursor(dictionary=dictionary)
+            try:
+                connection.start_transaction()
+                yield cursor
+                connection.commit()
+            except BaseException:
+                connection.rollback()
+                raise
+            finally:
+                cursor.close()
@@ -0,0 +1,262 @@
+import asyncio
+import os
+import random
+import smtplib
+import time
+from email.header import Header
+from email.mime.text import MIMEText
+from typing import List, Optional
+
+from aiomysql import DictCursor, MySQLError as AsyncMySQLError
+from mysql.connector import Error as MySQLError
+
+from . import async_db_manager, db_manager
+from .retry import is_transient
+
+
+class SMTPConnectionError(ConnectionError):
+    """无法连接或登录 SMTP 服务器"""
+
+
+class SMTPSender:
+    """复用同一条 SMTP 连接发送多封邮件，连接断开时自动重连
+
+    EMAIL_SECURITY=ssl      SMTP over SSL（默认，端口 465）
+    EMAIL_SECURITY=starttls 明文连接后 STARTTLS（端口 587）
+    EMAIL_SECURITY=plain    不加密、EMAIL_PASSWORD 为空时不登录，用于本地测试：
+                            python -m aiosmtpd -n -l localhost:8025
+    """
+    HOST: str = os.environ.get("EMAIL_HOST")
+    PORT: int = int(os.environ.get("EMAIL_PORT", 465))
+    USER: str = os.environ.get("EMAIL_USER")
+    PASSWORD: str = os.environ.get("EMAIL_PASSWORD")
+    SECURITY: str = os.environ.get("EMAIL_SECURITY", "ssl")
+    TIMEOUT = 30
+    # 空闲超过该时间的连接在使用前先 NOOP 探测，服务器可能已关闭连接
+    IDLE_CHECK = 30
+
+    def __init__(self):
+        self.server: Optional[smtplib.SMTP] = None
+        self.last_used = 0.0
+
+    def _connect(self):
+        if self.SECURITY == "ssl":
+            server = smtplib.SMTP_SSL(self.HOST, self.PORT, timeout=self.TIMEOUT)
+        else:
+            server = smtplib.SMTP(self.HOST, self.PORT, timeout=self.TIMEOUT)
+        try:
+            if self.SECURITY == "starttls":
+                server.starttls()
+            if self.PASSWORD:
+                server.login(self.USER, self.PASSWORD)
+        except OSError:
+            server.close()
+            raise
+        self.server = server
+
+    def _ensure_connection(self):
+        if self.server is not None and time.monotonic() - self.last_used > self.IDLE_CHECK:
+            try:
+                if self.server.noop()[0] != 250:
+                    self.close()
+            except OSError:
+                # smtplib.SMTPException 是 OSError 的子类，这里同时覆盖套接字错误
+                self.close()
+        if self.server is None:
+            self._connect()
+
+    def close(self):
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except OSError:
+                # quit 失败时不会关闭套接字
+                self.server.close()
+            self.server = None
+
+    def build_message(self, recipient: str, subject: str, html: str) -> str:
+        message = MIMEText(html, "html", "utf-8")
+        message["From"] = f"图书管理系统 <{self.USER}>"
+        message["To"] = recipient
+        message["Subject"] = Header(subject, "utf-8")
+        return message.as_string()
+
+    def send_batch(self, mails: List[dict]) -> List[Optional[Exception]]:
+        """按顺序发送，返回每封邮件的错误（成功为 None）；阻塞调用，应在线程中执行"""
+        errors: List[Optional[Exception]] = []
+        for index, mail in enumerate(mails):
+            content = self.build_message(mail["recipient"], mail["subject"], mail["body"])
+            error = None
+            # 连接在两次发送之间被服务器关闭时重连一次
+            for _ in range(2):
+                try:
+                    self._ensure_connection()
+                except OSError as e:
+                    # 无法连接或登录与邮件本身无关，本批剩余邮件按暂时性错误处理
+                    self.close()
+                    return errors + [SMTPConnectionError(f"连接 SMTP 服务器失败: {e}")] * (len(mails) - index)
+                try:
+                    self.server.sendmail(self.USER, mail["recipient"], content)
+                    self.last_used = time.monotonic()
+                    error = None
+                    break
+                except smtplib.SMTPServerDisconnected as e:
+                    self.close()
+                    error = e
+                except smtplib.SMTPException as e:
+                    # 服务器拒收这封邮件（如 550），连接仍可用，不重连也不重发
+                    error = e
+                    break
+                except OSError as e:
+                    # 套接字错误（超时、连接被重置）；SMTPException 也是 OSError 的子类，须放在其后
+                    self.close()
+                    error = e
+            errors.append(error)
+        return errors
+
+
+class EmailOutbox:
+    """邮件发件箱：业务代码只写入 email_outbox 表，由后台任务批量发送、失败按指数退避重试
+
+    多个进程同时运行时通过 MySQL 命名锁保证同一时刻只有一个进程在发送。
+    """
+    POLL_INTERVAL = float(os.environ.get("EMAIL_OUTBOX_POLL_INTERVAL", 1))
+    BATCH_SIZE = int(os.environ.get("EMAIL_OUTBOX_BATCH_SIZE", 50))
+    MAX_ATTEMPTS = int(os.environ.get("EMAIL_OUTBOX_MAX_ATTEMPTS", 12))
+    BASE_BACKOFF = 5
+    MAX_BACKOFF = 60 * 60
+    LOCK_NAME = "email_outbox:dispatch"
+
+    STATUS_PENDING = 0
+    STATUS_SENT = 1
+    STATUS_FAILED = 2
+
+    def __init__(self):
+        self.db_manager = db_manager
+        self.async_db_manager = async_db_manager
+        self.sender = SMTPSender()
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def enqueue(self, recipient: str, subject: str, html: str, cursor=None) -> bool:
+        """写入发件箱；传入 cursor 时在调用方的事务内写入"""
+        sql = """
+              INSERT INTO email_outbox (recipient, subject, body, status, attempts, next_attempt_at, create_time)
+              VALUES (%s, %s, %s, %s, 0, %s, %s) \
+              """
+        now = int(time.time() * 1000)
+        params = (recipient, subject, html, self.STATUS_PENDING, now, now)
+        try:
+            if cursor is not None:
+                cursor.execute(sql, params)
+            else:
+                with self.db_manager.get_cursor() as own_cursor:
+                    own_cursor.execute(sql, params)
+            self.notify()
+            return True
+        except MySQLError as e:
+            print(f"写入发件箱失败: {e}")
+            if cursor is not None:
+                raise
+            return False
+
+    def notify(self):
+        """唤醒后台发送任务（可在任意线程调用），未启动时忽略"""
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _backoff(self, attempts: int) -> int:
+        """第 attempts 次失败后的等待毫秒数"""
+        delay = min(self.MAX_BACKOFF, self.BASE_BACKOFF * 2 ** (attempts - 1))
+        return int(random.uniform(delay / 2, delay) * 1000)
+
+    async def dispatch(self) -> int:
+        """发送一批到期邮件，返回本批处理的邮件数；其他进程正在发送时返回 0"""
+        async with self.async_db_manager.get_connection() as connection:
+            async with connection.cursor(DictCursor) as cursor:
+                await cursor.execute("SELECT GET_LOCK(%s, 0) AS locked", (self.LOCK_NAME,))
+                locked = await cursor.fetchone()
+                if not locked or locked["locked"] != 1:
+                    return 0
+                try:
+                    await cursor.execute("""
+                                   SELECT id, recipient, subject, body, attempts
+                                   FROM email_outbox
+                                   WHERE status = %s
+                                     AND next_attempt_at <= %s
+                                   ORDER BY next_attempt_at
+                                   LIMIT %s
+                                   """, (self.STATUS_PENDING, int(time.time() * 1000), self.BATCH_SIZE))
+                    mails = await cursor.fetchall()
+                    if not mails:
+                        return 0
+
+                    errors = await asyncio.to_thread(self.sender.send_batch, mails)
+
+                    now = int(time.time() * 1000)
+                    sent = [mail["id"] for mail, error in zip(mails, errors) if error is None]
+                    if sent:
+                        await cursor.executemany(
+                            "UPDATE email_outbox SET status = %s, attempts = attempts + 1, sent_time = %s "
+                            "WHERE id = %s",
+                            [(self.STATUS_SENT, now, mail_id) for mail_id in sent]
+                        )
+                    for mail, error in zip(mails, errors):
+                        if error is None:
+                            continue
+                        attempts = mail["attempts"] + 1
+                        give_up = attempts >= self.MAX_ATTEMPTS or not is_transient(error)
+                        print(f"邮件发送失败 (收件人 {mail['recipient']}, 尝试 {attempts}/{self.MAX_ATTEMPTS}): {error}")
+                        await cursor.execute("""
+                                       UPDATE email_outbox
+                                       SET status          = %s,
+                                           attempts        = %s,
+                                           next_attempt_at = %s,
+                                           last_error      = %s
+                                       WHERE id = %s
+                                       """, (self.STATUS_FAILED if give_up else self.STATUS_PENDING, attempts,
+                                             now + self._backoff(attempts), str(error)[:512], mail["id"]))
+                    return len(mails)
+                finally:
+                    await cursor.execute("SELECT RELEASE_LOCK(%s)", (self.LOCK_NAME,))
+
+    async def _run(self):
+        while True:
+            processed = 0
+            try:
+                processed = await self.dispatch()
+            except AsyncMySQLError as e:
+                print(f"发件箱处理失败: {e}")
+            except Exception as e:
+                print(f"发件箱处理未知错误: {e}")
+            if processed >= self.BATCH_SIZE:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def start(self) -> bool:
+        """在当前事件循环中启动后台发送任务，EMAIL_OUTBOX_POLL_INTERVAL 为 0 时不启用"""
+        if self.POLL_INTERVAL <= 0 or self._task is not None:
+            return False
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        return True
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._loop = None
+        await asyncio.to_thread(self.sender.close)
+
+
+email_outbox = EmailOutbox()
@@ -0,0 +1,83 @@
+import asyncio
+import os
+import time
+from typing import Optional
+
+from aiomysql import MySQLError
+
+from . import async_db_manager
+
+
+class OverdueSweeper:
+    """后台逾期标记任务：按到期时间索引分批把未归还且已到期的借阅记录标记为逾期
+
+    多个进程同时运行时通过 MySQL 命名锁保证同一时刻只有一个进程在标记。
+    """
+    INTERVAL = int(os.environ.get("OVERDUE_SWEEP_INTERVAL", 60))
+    BATCH_SIZE = int(os.environ.get("OVERDUE_SWEEP_BATCH_SIZE", 500))
+    LOCK_NAME = "circulate:overdue_sweep"
+
+    def __init__(self):
+        self.db_manager = async_db_manager
+        self._task: Optional[asyncio.Task] = None
+
+    async def sweep(self) -> int:
+        """执行一轮标记，返回本轮标记的记录数；其他进程正在标记时返回 0"""
+        now = int(time.time() * 1000)
+        marked = 0
+        async with self.db_manager.get_connection() as connection:
+            async with connection.cursor() as cursor:
+                await cursor.execute("SELECT GET_LOCK(%s, 0)", (self.LOCK_NAME,))
+                locked = await cursor.fetchone()
+                if not locked or locked[0] != 1:
+                    return 0
+                try:
+                    while True:
+                        # 每批单独提交（autocommit），避免长时间持有大量行锁
+                        await cursor.execute("""
+                                       UPDATE circulate
+                                       SET is_time_out = 1
+                                       WHERE is_return = 0
+                                         AND is_time_out = 0
+                                         AND due_time < %s
+                                       ORDER BY due_time
+                                       LIMIT %s
+                                       """, (now, self.BATCH_SIZE))
+                        marked += cursor.rowcount
+                        if cursor.rowcount < self.BATCH_SIZE:
+                            break
+                        await asyncio.sleep(0)
+                finally:
+                    await cursor.execute("SELECT RELEASE_LOCK(%s)", (self.LOCK_NAME,))
+        return marked
+
+    async def _run(self):
+        while True:
+            try:
+                marked = await self.sweep()
+                if marked:
+                    print(f"已标记逾期借阅记录: {marked}")
+            except MySQLError as e:
+                print(f"标记逾期借阅记录失败: {e}")
+            except Exception as e:
+                print(f"标记逾期借阅记录未知错误: {e}")
+            await asyncio.sleep(self.INTERVAL)
+
+    def start(self) -> bool:
+        """在当前事件循环中启动后台任务，OVERDUE_SWEEP_INTERVAL 为 0 时不启用"""
+        if self.INTERVAL <= 0 or self._task is not None:
+            return False
+        self._task = asyncio.create_task(self._run())
+        return True
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+overdue_sweeper = OverdueSweeper()
@@ -1,9 +1,44 @@
+import asyncio
+import base64
 import hashlib
+import hmac
+import os
 import secrets
 import string
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from .breaker import mark_unavailable
+
+
+class PasswordHasherBusy(RuntimeError):
+    """等待计算的密码哈希过多，请求被拒绝"""
 
 
 class PasswordEncryption:
+    """密码哈希
+
+    当前格式: $scrypt$ln=14,r=8,p=1$<盐 base64>$<密钥 base64>，参数随哈希一起保存，调整成本后旧哈希仍可校验，
+    并在下次登录时升级。旧格式为 sha256(sha256(password) + salt) 的十六进制串，盐单独存于 users.salt。
+
+    scrypt 计算在专用的有界线程池中执行（hashlib.scrypt 计算期间释放 GIL），
+    排队任务超过 PASSWORD_HASH_MAX_PENDING 时直接拒绝，避免登录高峰占满请求线程池。
+    """
+    SCHEME = "scrypt"
+    SCRYPT_LN = int(os.environ.get("PASSWORD_SCRYPT_LN", 14))
+    SCRYPT_R = int(os.environ.get("PASSWORD_SCRYPT_R", 8))
+    SCRYPT_P = int(os.environ.get("PASSWORD_SCRYPT_P", 1))
+    SALT_BYTES = 16
+    KEY_BYTES = 32
+
+    HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", os.cpu_count() or 1))
+    MAX_PENDING = int(os.environ.get("PASSWORD_HASH_MAX_PENDING", HASH_WORKERS * 32))
+
+    _executor: Optional[ThreadPoolExecutor] = None
+    _executor_lock = threading.Lock()
+    _pending = threading.BoundedSemaphore(MAX_PENDING)
+
     @staticmethod
     def generate_salt(length: int = 8) -> str:
         chars = string.ascii_uppercase + string.digits
@@ -14,6 +49,103 @@ class PasswordEncryption:
         return hashlib.sha256(data.encode(encoding)).hexdigest()
 
     @staticmethod
-    def hash_password(password: str, salt: str) -> str:
+    def legacy_hash(password: str, salt: str) -> str:
+        """旧格式哈希，仅用于校验升级前的密码"""
         first_hash = PasswordEncryption.sha256_hex(password)
         return PasswordEncryption.sha256_hex(first_hash + salt)
+
+    @staticmethod
+    def _b64encode(data: bytes) -> str:
+        return base64.b64encode(data).decode("ascii").rstrip("=")
+
+    @staticmethod
+    def _b64decode(data: str) -> bytes:
+        return base64.b64decode(data + "=" * (-len(data) % 4))
+
+    @staticmethod
+    def _scrypt(password: str, salt: bytes, ln: int, r: int, p: int) -> bytes:
+        n = 1 << ln
+        return hashlib.scrypt(password.encode("utf-8"), salt=salt, n=n, r=r, p=p,
+                              maxmem=256 * n * r * p, dklen=PasswordEncryption.KEY_BYTES)
+
+    @classmethod
+    def hash_password(cls, password: str) -> Tuple[str, str]:
+        """计算新格式哈希，返回 (哈希串, 盐)；盐已包含在哈希串中，另行返回用于写入 users.salt"""
+        salt = secrets.token_bytes(cls.SALT_BYTES)
+        key = cls._scrypt(password, salt, cls.SCRYPT_LN, cls.SCRYPT_R, cls.SCRYPT_P)
+        salt_b64 = cls._b64encode(salt)
+        params = f"ln={cls.SCRYPT_LN},r={cls.SCRYPT_R},p={cls.SCRYPT_P}"
+        return f"${cls.SCHEME}${params}${salt_b64}${cls._b64encode(key)}", salt_b64
+
+    @classmethod
+    def _parse(cls, stored: str) -> Optional[Tuple[int, int, int, bytes, bytes]]:
+        try:
+            _, scheme, params, salt, key = stored.split("$")
+            if scheme != cls.SCHEME:
+                return None
+            values = dict(item.split("=") for item in params.split(","))
+            return int(values["ln"]), int(values["r"]), int(values["p"]), cls._b64decode(salt), cls._b64decode(key)
+        except (ValueError, KeyError):
+            return None
+
+    @classmethod
+    def verify_password(cls, password: str, stored: str, legacy_salt: Optional[str] = None) -> bool:
+        """校验密码，同时支持新格式与旧格式"""
+        if not stored:
+            return False
+        if not stored.startswith("$"):
+            return hmac.compare_digest(cls.legacy_hash(password, legacy_salt or ""), stored)
+        parsed = cls._parse(stored)
+        if parsed is None:
+            return False
+        ln, r, p, salt, key = parsed
+        return hmac.compare_digest(cls._scrypt(password, salt, ln, r, p), key)
+
+    @classmethod
+    def needs_rehash(cls, stored: str) -> bool:
+        """旧格式或成本参数与当前配置不一致时需要重新计算"""
+        parsed = cls._parse(stored) if stored and stored.startswith("$") else None
+        return parsed is None or parsed[:3] != (cls.SCRYPT_LN, cls.SCRYPT_R, cls.SCRYPT_P)
+
+    @classmethod
+    def _get_executor(cls) -> ThreadPoolExecutor:
+        if cls._executor is None:
+            with cls._executor_lock:
+                if cls._executor is None:
+                    cls._executor = ThreadPoolExecutor(max_workers=cls.HASH_WORKERS,
+                                                       thread_name_prefix="password-hash")
+        return cls._executor
+
+    @classmethod
+    def shutdown_executor(cls):
+        if cls._executor is not None:
+            cls._executor.shutdown(cancel_futures=True)
+            cls._executor = None
+
+    @classmethod
+    def _submit(cls, func, *args, critical: bool = True) -> Future:
+        """提交到哈希线程池；排队已满时抛出 PasswordHasherBusy，critical 为 True 时并使当前请求返回 503"""
+        if not cls._pending.acquire(blocking=False):
+            if critical:
+                mark_unavailable("密码校验", 1)
+            raise PasswordHasherBusy("密码哈希队列已满")
+        future = cls._get_executor().submit(func, *args)
+        future.add_done_callback(lambda _: cls._pending.release())
+        return future
+
+    @classmethod
+    def hash_pooled(cls, password: str) -> Tuple[str, str]:
+        """同步调用方（请求线程池中的同步接口）使用"""
+        return cls._submit(cls.hash_password, password).result()
+
+    @classmethod
+    async def hash_async(cls, password: str, critical: bool = True) -> Tuple[str, str]:
+        """critical=False 用于可以放弃的计算（如登录后升级哈希），队列已满时不影响请求结果"""
+        return await asyncio.wrap_future(cls._submit(cls.hash_password, password, critical=critical))
+
+    @classmethod
+    async def verify_async(cls, password: str, stored: str, legacy_salt: Optional[str] = None) -> bool:
+        if stored and not stored.startswith("$"):
+            # 旧格式只是两次 SHA-256，直接计算比切换线程更快
+            return cls.verify_password(password, stored, legacy_salt)
+        return await asyncio.wrap_future(cls._submit(cls.verify_password, password, stored, legacy_salt))
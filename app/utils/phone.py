@@ -5,7 +5,8 @@ from typing import Optional, Callable
 
 from mysql.connector import Error as MySQLError
 
-from . import db_manager
+from . import db_manager, user_cache
+from .retry import retry_policy
 
 
 class Phone:
@@ -24,17 +25,15 @@ class Phone:
 
     def __execute_update(self, sql: str, params: tuple) -> bool:
         """执行更新操作，包含重试机制"""
-        max_retries = 3
-        for attempt in range(max_retries):
+        for attempt in retry_policy.attempts():
             try:
                 with self.db_manager.get_cursor() as cursor:
                     cursor.execute(sql, params)
                     return cursor.rowcount > 0
             except MySQLError as e:
-                print(f"数据库更新失败 (尝试 {attempt + 1}/{max_retries}): {e}")
-                if attempt == max_retries - 1:
+                print(f"数据库更新失败 (尝试 {attempt}): {e}")
+                if not attempt.backoff(e):
                     return False
-                time.sleep(1)
             except Exception as e:
                 print(f"未知错误: {e}")
                 return False
@@ -66,12 +65,14 @@ class Phone:
               WHERE username = %s \
               """
         expire_time = int(time.time()) + self.CODE_EXPIRATION_SECONDS
-        return self.__execute_update(sql, (self.phone, code, expire_time, False, self.username))
+        updated = self.__execute_update(sql, (self.phone, code, expire_time, False, self.username))
+        if updated:
+            user_cache.invalidate(self.username)
+        return updated
 
     def verify_code(self, code: str) -> bool:
         """验证验证码"""
-        max_retries = 3
-        for attempt in range(max_retries):
+        for attempt in retry_policy.attempts():
             try:
                 with self.db_manager.get_cursor(dictionary=True) as cursor:
                     sql = """
@@ -106,13 +107,15 @@ class Phone:
                                    AND phone = %s \
                                  """
                     cursor.execute(update_sql, (None, None, True, self.username, self.phone))
-                    return cursor.rowcount > 0
+                    if cursor.rowcount > 0:
+                        user_cache.invalidate(self.username)
+                        return True
+                    return False
 
             except MySQLError as e:
-                print(f"验证验证码失败 (尝试 {attempt + 1}/{max_retries}): {e}")
-                if attempt == max_retries - 1:
+                print(f"验证验证码失败 (尝试 {attempt}): {e}")
+                if not attempt.backoff(e):
                     return False
-                time.sleep(1)
             except Exception as e:
                 print(f"未知错误: {e}")
                 return False
@@ -120,8 +123,7 @@ class Phone:
 
     def get_phone_verified(self) -> bool:
         """获取手机验证状态"""
-        max_retries = 3
-        for attempt in range(max_retries):
+        for attempt in retry_policy.attempts():
             try:
                 with self.db_manager.get_cursor() as cursor:
                     sql = "SELECT phone_verified FROM users WHERE username = %s"
@@ -129,10 +131,9 @@ class Phone:
                     result = cursor.fetchone()
                     return bool(result and result["phone_verified"])
             except MySQLError as e:
-                print(f"查询手机验证状态失败 (尝试 {attempt + 1}/{max_retries}): {e}")
-                if attempt == max_retries - 1:
+                print(f"查询手机验证状态失败 (尝试 {attempt}): {e}")
+                if not attempt.backoff(e):
                     return False
-                time.sleep(1)
             except Exception as e:
                 print(f"未知错误: {e}")
                 return False
@@ -140,8 +141,7 @@ class Phone:
 
     def check_code_status(self) -> dict:
         """检查验证码状态"""
-        max_retries = 3
-        for attempt in range(max_retries):
+        for attempt in retry_policy.attempts():
             try:
                 with self.db_manager.get_cursor(dictionary=True) as cursor:
                     sql = """
@@ -169,10 +169,9 @@ class Phone:
                     }
 
             except MySQLError as e:
-                print(f"检查验证码状态失败 (尝试 {attempt + 1}/{max_retries}): {e}")
-                if attempt == max_retries - 1:
+                print(f"检查验证码状态失败 (尝试 {attempt}): {e}")
+                if not attempt.backoff(e):
                     return {"exists": False, "error": str(e)}
-                time.sleep(1)
             except Exception as e:
                 print(f"未知错误: {e}")
                 return {"exists": False, "error": str(e)}
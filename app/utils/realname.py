@@ -4,8 +4,9 @@ from typing import Optional
 from mysql.connector import Error as MySQLError
 
 from app.schemas.user import RealNameInfo, UserInfo
-from . import db_manager
+from . import db_manager, user_cache
 from .phone import Phone
+from .retry import retry_policy
 
 
 class RealName:
@@ -35,8 +36,7 @@ class RealName:
 
     def __get_real_name_verified(self) -> bool | None:
         """检查用户是否已经完成实名认证"""
-        max_retries = 3
-        for attempt in range(max_retries):
+        for attempt in retry_policy.attempts():
             try:
                 with self.db_manager.get_cursor(dictionary=True) as cursor:
                     sql = "SELECT realname_verified FROM users WHERE username = %s"
@@ -44,10 +44,9 @@ class RealName:
                     result = cursor.fetchone()
                     return bool(result and result['realname_verified'])
             except MySQLError as e:
-                print(f"查询实名认证状态失败 (尝试 {attempt + 1}/{max_retries}): {e}")
-                if attempt == max_retries - 1:
+                print(f"查询实名认证状态失败 (尝试 {attempt}): {e}")
+                if not attempt.backoff(e):
                     raise e
-                continue
 
     @staticmethod
     def __mask_real_name(real_name: Optional[str]) -> str:
@@ -67,8 +66,7 @@ class RealName:
 
     def get_masked_real_name(self) -> Optional[RealNameInfo]:
         """获取脱敏的实名信息"""
-        max_retries = 3
-        for attempt in range(max_retries):
+        for attempt in retry_policy.attempts():
             try:
                 with self.db_manager.get_cursor(dictionary=True) as cursor:
                     sql = "SELECT real_name, id_card FROM users WHERE username = %s"
@@ -83,15 +81,13 @@ class RealName:
                         idcard=self.__mask_id_card(result['id_card'])
                     )
             except MySQLError as e:
-                print(f"获取脱敏实名信息失败 (尝试 {attempt + 1}/{max_retries}): {e}")
-                if attempt == max_retries - 1:
+                print(f"获取脱敏实名信息失败 (尝试 {attempt}): {e}")
+                if not attempt.backoff(e):
                     raise e
-                continue
 
     def verify(self) -> Optional[RealNameInfo]:
         """执行实名认证"""
-        max_retries = 3
-        for attempt in range(max_retries):
+        for attempt in retry_policy.attempts():
             try:
                 phone = Phone(self.user.username, self.user.phone)
                 phone_verified = phone.get_phone_verified()
@@ -117,6 +113,7 @@ class RealName:
                                 self.user.username
                             ))
                             connection.commit()
+                            user_cache.invalidate(self.user.username)
 
                             return RealNameInfo(
                                 realname=self.real_name,
@@ -126,15 +123,13 @@ class RealName:
                 return None
 
             except MySQLError as e:
-                print(f"实名认证失败 (尝试 {attempt + 1}/{max_retries}): {e}")
-                if attempt == max_retries - 1:
+                print(f"实名认证失败 (尝试 {attempt}): {e}")
+                if not attempt.backoff(e):
                     raise e
-                continue
 
     def update_real_name_info(self, real_name: str, id_card: str) -> bool:
         """更新实名信息（不验证）"""
-        max_retries = 3
-        for attempt in range(max_retries):
+        for attempt in retry_policy.attempts():
             try:
                 with self.db_manager.get_connection() as connection:
                     with connection.cursor(dictionary=True) as cursor:
@@ -146,18 +141,17 @@ class RealName:
                               """
                         cursor.execute(sql, (real_name, id_card, self.user.username))
                         connection.commit()
+                        user_cache.invalidate(self.user.username)
                         return cursor.rowcount > 0
             except MySQLError as e:
-                print(f"更新实名信息失败 (尝试 {attempt + 1}/{max_retries}): {e}")
-                if attempt == max_retries - 1:
+                print(f"更新实名信息失败 (尝试 {attempt}): {e}")
+                if not attempt.backoff(e):
                     raise e
-                continue
         return False
 
     def get_full_real_name_info(self) -> Optional[RealNameInfo]:
         """获取完整的实名信息（管理员权限）"""
-        max_retries = 3
-        for attempt in range(max_retries):
+        for attempt in retry_policy.attempts():
             try:
                 with self.db_manager.get_cursor(dictionary=True) as cursor:
                     sql = "SELECT real_name, id_card FROM users WHERE username = %s"
@@ -172,10 +166,9 @@ class RealName:
                         idcard=result['id_card'],
                     )
             except MySQLError as e:
-                print(f"获取完整实名信息失败 (尝试 {attempt + 1}/{max_retries}): {e}")
-                if attempt == max_retries - 1:
+                print(f"获取完整实名信息失败 (尝试 {attempt}): {e}")
+                if not attempt.backoff(e):
                     raise e
-                continue
 
     def check_real_name_verified(self) -> bool:
         """检查用户是否已完成实名认证"""
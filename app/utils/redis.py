@@ -1,6 +1,14 @@
 import os
 
 import redis
+import redis.asyncio
+from redis import RedisError
+
+from .breaker import CircuitBreaker, CircuitOpenError
+
+
+class RedisUnavailableError(CircuitOpenError, RedisError):
+    """Redis 熔断中"""
 
 
 class Redis:
@@ -11,15 +19,96 @@ class Redis:
                 port=os.environ.get('REDIS_PORT'),
                 password=os.environ.get('REDIS_PASSWORD'),
                 db=os.environ.get('REDIS_DB'),
-                decode_responses=True
+                decode_responses=True,
+                socket_connect_timeout=float(os.environ.get('REDIS_SOCKET_TIMEOUT', 2)),
+                socket_timeout=float(os.environ.get('REDIS_SOCKET_TIMEOUT', 2))
             )
         )
+        # 异步请求处理中使用，避免阻塞事件循环；与同步客户端共用熔断器
+        self.async_redis = redis.asyncio.Redis(
+            connection_pool=redis.asyncio.ConnectionPool(
+                host=os.environ.get('REDIS_HOST'),
+                port=os.environ.get('REDIS_PORT'),
+                password=os.environ.get('REDIS_PASSWORD'),
+                db=os.environ.get('REDIS_DB'),
+                decode_responses=True,
+                socket_connect_timeout=float(os.environ.get('REDIS_SOCKET_TIMEOUT', 2)),
+                socket_timeout=float(os.environ.get('REDIS_SOCKET_TIMEOUT', 2))
+            )
+        )
+        # 缓存读写失败时调用方均可降级，熔断只用于快速失败，不使请求返回 503
+        self.breaker = CircuitBreaker("Redis", RedisUnavailableError, critical=False)
+
+    def _call(self, func, *args, **kwargs):
+        """经熔断器执行 Redis 命令；熔断时直接抛出 RedisUnavailableError"""
+        self.breaker.before_call()
+        try:
+            result = func(*args, **kwargs)
+        except RedisError as e:
+            self.breaker.record_failure(e)
+            raise
+        self.breaker.record_success()
+        return result
+
+    async def _call_async(self, func, *args, **kwargs):
+        """_call 的异步版本，func 为 async_redis 的方法"""
+        self.breaker.before_call()
+        try:
+            result = await func(*args, **kwargs)
+        except RedisError as e:
+            self.breaker.record_failure(e)
+            raise
+        self.breaker.record_success()
+        return result
+
+    async def close_async(self):
+        await self.async_redis.aclose()
 
     def set(self, key: str, value: str, expire_time=0):
-        self.redis.set(key, value, ex=expire_time)
+        self._call(self.redis.set, key, value, ex=expire_time)
 
     def get(self, key):
-        return self.redis.get(key)
+        return self._call(self.redis.get, key)
 
     def delete(self, key):
-        return self.redis.delete(key)
+        return self._call(self.redis.delete, key)
+
+    def incr(self, key):
+        return self._call(self.redis.incr, key)
+
+    def set_nx(self, key: str, value: str, expire_time: int) -> bool:
+        """键不存在时写入，返回是否写入成功"""
+        return bool(self._call(self.redis.set, key, value, ex=expire_time, nx=True))
+
+    def ttl(self, key: str) -> int:
+        return self._call(self.redis.ttl, key)
+
+    def register_script(self, script: str):
+        """注册 Lua 脚本，返回经熔断器执行的函数 (keys, args)，脚本在 Redis 中原子执行"""
+        compiled = self.redis.register_script(script)
+        return lambda keys, args: self._call(compiled, keys=keys, args=args)
+
+    def pipeline(self, *commands) -> list:
+        """一次往返执行多条命令，commands 形如 ("get", key)，返回各命令结果"""
+        pipe = self.redis.pipeline(transaction=False)
+        for name, *args in commands:
+            getattr(pipe, name)(*args)
+        return self._call(pipe.execute)
+
+    async def get_async(self, key):
+        return await self._call_async(self.async_redis.get, key)
+
+    async def set_async(self, key: str, value: str, expire_time=0):
+        await self._call_async(self.async_redis.set, key, value, ex=expire_time)
+
+    async def delete_async(self, key):
+        return await self._call_async(self.async_redis.delete, key)
+
+    async def incr_async(self, key):
+        return await self._call_async(self.async_redis.incr, key)
+
+    async def pipeline_async(self, *commands) -> list:
+        pipe = self.async_redis.pipeline(transaction=False)
+        for name, *args in commands:
+            getattr(pipe, name)(*args)
+        return await self._call_async(pipe.execute)
@@ -1,15 +1,17 @@
 import re
 import time
-from typing import Optional, Any
+from typing import Optional, Tuple
 
 from mysql.connector import Error as MySQLError
 
 from app.schemas.common import ResponseNormal
 from . import db_manager
+from .bloom import registration_index
 from .email import Email
-from .password import PasswordEncryption
+from .outbox import email_outbox
+from .password import PasswordEncryption, PasswordHasherBusy
 from .rsa import RSA
-from .user import User
+from .retry import retry_policy
 
 
 class Register:
@@ -35,55 +37,60 @@ class Register:
         return None
 
     def check_existing_user(self) -> Optional[ResponseNormal]:
-        """检查用户是否已存在"""
-        try:
-            user = User(self.username)
-            if user.select_by_username():
-                return ResponseNormal(msg="用户名已存在", code=1)
-
-            # 也可以检查邮箱是否已被使用
-            if self._is_email_registered():
-                return ResponseNormal(msg="邮箱已被注册", code=1)
-
+        """检查用户名、邮箱是否已被占用；布隆过滤器判定一定未占用时不查询数据库"""
+        if not registration_index.might_exist(self.username, self.email):
             return None
-        except Exception as e:
-            print(f"检查用户存在性失败: {e}")
+
+        conflicts = self._find_conflicts()
+        if conflicts is None:
             return ResponseNormal(msg="系统错误，请稍后重试", code=1)
+        username_taken, email_taken = conflicts
+        if username_taken:
+            return ResponseNormal(msg="用户名已存在", code=1)
+        if email_taken:
+            return ResponseNormal(msg="邮箱已被注册", code=1)
+        return None
 
-    def _is_email_registered(self) -> bool:
-        """检查邮箱是否已被注册"""
-        max_retries = 3
-        for attempt in range(max_retries):
+    def _find_conflicts(self) -> Optional[Tuple[bool, bool]]:
+        """一次查询同时确认用户名与邮箱是否已被占用，返回 (用户名已占用, 邮箱已占用)"""
+        for attempt in retry_policy.attempts():
             try:
                 with self.db_manager.get_cursor(dictionary=True) as cursor:
-                    sql = "SELECT username FROM users WHERE email = %s"
-                    cursor.execute(sql, (self.email,))
+                    sql = """
+                          SELECT MAX(username = %s) AS username_taken,
+                                 MAX(email = %s)    AS email_taken
+                          FROM users
+                          WHERE username = %s
+                             OR email = %s \
+                          """
+                    cursor.execute(sql, (self.username, self.email, self.username, self.email))
                     result = cursor.fetchone()
-                    return result is not None
+                    return bool(result['username_taken']), bool(result['email_taken'])
             except MySQLError as e:
-                print(f"检查邮箱注册状态失败 (尝试 {attempt + 1}/{max_retries}): {e}")
-                if attempt == max_retries - 1:
-                    return True
-                time.sleep(1)
+                print(f"检查注册信息失败 (尝试 {attempt}): {e}")
+                if not attempt.backoff(e):
+                    return None
             except Exception as e:
                 print(f"未知错误: {e}")
-                return True
-        return True
+                return None
+        return None
 
     def create_user(self) -> bool | None:
-        """创建用户"""
-        salt = PasswordEncryption.generate_salt()
+        """创建用户；用户名或邮箱与已有用户冲突时返回 None"""
         try:
-            decrypted_password = RSA().decrypt_by_private(self.password)
+            decrypted_password = RSA().decrypt_pooled(self.password)
         except Exception as e:
             print(f"密码解密失败: {e}")
             return False
 
-        hashed_password = PasswordEncryption.hash_password(decrypted_password, salt)
+        try:
+            hashed_password, salt = PasswordEncryption.hash_pooled(decrypted_password)
+        except PasswordHasherBusy as e:
+            print(f"密码哈希失败: {e}")
+            return False
 
         email_util = Email(self.username, self.email)
-        token = email_util.generate_token()
-        email_util.token = token
+        email_util.generate_token()
 
         permission = 4
         create_time = round(time.time() * 1000)
@@ -94,30 +101,32 @@ class Register:
               VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s) \
               """
 
-        max_retries = 3
-        for attempt in range(max_retries):
+        for attempt in retry_policy.attempts():
             try:
-                with self.db_manager.get_cursor() as cursor:
+                # 用户与验证邮件在同一事务内写入，邮件由发件箱后台任务发送，注册不等待 SMTP
+                with self.db_manager.transaction() as cursor:
                     cursor.execute(sql, (
                         self.username, hashed_password, salt, self.email,
-                        permission, create_time, token, 0, 0, 0
+                        permission, create_time, None, 0, 0, 0
                     ))
-                    email_sent = email_util.send_email()
-                    if not email_sent:
-                        print("警告：验证邮件发送失败")
+                    email_util.send_email(cursor)
+                # 用户写入成功后才签发 token：签发会作废同名用户之前的 token，
+                # 插入因唯一键冲突失败时不能影响已有用户待验证的链接
+                if not email_util.save_token():
+                    print("警告：验证 token 保存失败，用户可稍后重新发送验证邮件")
+                email_outbox.notify()
+                registration_index.add(self.username, self.email)
 
-                    return True
+                return True
 
             except MySQLError as e:
-                print(f"创建用户失败 (尝试 {attempt + 1}/{max_retries}): {e}")
-
+                print(f"创建用户失败 (尝试 {attempt}): {e}")
+                # 唯一索引冲突：预检查之后被并发注册或其他进程抢先占用
                 if e.errno == 1062:
+                    return None
+                if not attempt.backoff(e):
                     return False
 
-                if attempt == max_retries - 1:
-                    return False
-                time.sleep(1)
-
             except Exception as e:
                 print(f"创建用户时发生未知错误: {e}")
                 return False
@@ -133,11 +142,17 @@ class Register:
             if existing_error:
                 return existing_error
 
-            if self.create_user():
+            created = self.create_user()
+            if created:
                 return ResponseNormal(
                     msg="注册成功，请查收验证邮件完成账号激活",
                     code=0
                 )
+            elif created is None:
+                return ResponseNormal(
+                    msg="用户名或邮箱已被注册",
+                    code=1
+                )
             else:
                 return ResponseNormal(
                     msg="注册失败，请稍后重试",
@@ -0,0 +1,128 @@
+import asyncio
+import os
+import random
+import smtplib
+import time
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from mysql.connector.errors import PoolError
+from pymysql.err import InterfaceError
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+
+# 当前请求所有重试共享的截止时间（time.monotonic()），由 LoadShedMiddleware 在请求开始时设置；
+# 请求触发的后台任务应重置为 None，不受发起请求的截止时间限制
+request_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+# 可重试的 MySQL 错误码：连接类错误、连接数耗尽、锁等待超时与死锁
+TRANSIENT_MYSQL_ERRNOS = frozenset({
+    1040,  # Too many connections
+    1205,  # Lock wait timeout exceeded
+    1213,  # Deadlock found when trying to get lock
+    2002,  # Can't connect to local MySQL server
+    2003,  # Can't connect to MySQL server
+    2006,  # MySQL server has gone away
+    2013,  # Lost connection to MySQL server
+    2026,  # SSL connection error
+    2055,  # Lost connection to MySQL server at '%s', system error
+})
+
+
+def is_transient(error: BaseException) -> bool:
+    """判断错误是否为暂时性错误（重试可能成功）；主键冲突、语法错误等永久性错误返回 False"""
+    if isinstance(error, (ConnectionError, TimeoutError, asyncio.TimeoutError,
+                          RedisConnectionError, RedisTimeoutError, PoolError, InterfaceError)):
+        return True
+    if isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+
+    # mysql-connector 错误码在 errno 属性，aiomysql / pymysql 在 args[0]
+    errno = getattr(error, "errno", None)
+    if errno is None and error.args and isinstance(error.args[0], int):
+        errno = error.args[0]
+    return errno in TRANSIENT_MYSQL_ERRNOS
+
+
+class Attempt:
+    """一次尝试；失败后调用 backoff / backoff_async 决定是否继续"""
+
+    def __init__(self, policy: "RetryPolicy", number: int, max_attempts: int, deadline: float):
+        self.policy = policy
+        self.number = number
+        self.max_attempts = max_attempts
+        self.deadline = deadline
+
+    def __str__(self) -> str:
+        return f"{self.number}/{self.max_attempts}"
+
+    def _next_delay(self, error: BaseException) -> Optional[float]:
+        """返回下次重试前的等待时间；不应重试时返回 None"""
+        if self.number >= self.max_attempts or not is_transient(error):
+            return None
+        delay = self.policy.delay(self.number)
+        if time.monotonic() + delay >= self.deadline:
+            return None
+        return delay
+
+    def backoff(self, error: BaseException) -> bool:
+        """同步等待后返回 True 表示继续重试，返回 False 表示应放弃"""
+        delay = self._next_delay(error)
+        if delay is None:
+            return False
+        time.sleep(delay)
+        return True
+
+    async def backoff_async(self, error: BaseException) -> bool:
+        """异步等待，不阻塞事件循环"""
+        delay = self._next_delay(error)
+        if delay is None:
+            return False
+        await asyncio.sleep(delay)
+        return True
+
+
+class RetryPolicy:
+    """指数退避 + 全抖动的重试策略，只重试暂时性错误，并限制单次请求的总耗时
+
+    每次 attempts() 的截止时间为 RETRY_DEADLINE 秒后与请求截止时间（RETRY_REQUEST_DEADLINE，
+    同一请求内经过的多个重试循环共享）中较早的一个。
+
+    用法:
+        for attempt in retry_policy.attempts():
+            try:
+                ...
+            except MySQLError as e:
+                print(f"... (尝试 {attempt}): {e}")
+                if not attempt.backoff(e):
+                    return None
+    """
+    MAX_ATTEMPTS = int(os.environ.get("RETRY_MAX_ATTEMPTS", 3))
+    BASE_DELAY = float(os.environ.get("RETRY_BASE_DELAY", 0.1))
+    MAX_DELAY = float(os.environ.get("RETRY_MAX_DELAY", 2))
+    DEADLINE = float(os.environ.get("RETRY_DEADLINE", 5))
+    REQUEST_DEADLINE = float(os.environ.get("RETRY_REQUEST_DEADLINE", DEADLINE))
+
+    def __init__(self, max_attempts: int = None, base_delay: float = None, max_delay: float = None,
+                 deadline: float = None):
+        self.max_attempts = max_attempts or self.MAX_ATTEMPTS
+        self.base_delay = self.BASE_DELAY if base_delay is None else base_delay
+        self.max_delay = self.MAX_DELAY if max_delay is None else max_delay
+        self.deadline = self.DEADLINE if deadline is None else deadline
+
+    def delay(self, number: int) -> float:
+        """第 number 次失败后的等待时间，在 [0, min(max_delay, base_delay * 2^(number-1))] 内均匀抖动"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (number - 1)))
+
+    def attempts(self, max_attempts: int = None) -> Iterator[Attempt]:
+        max_attempts = max_attempts or self.max_attempts
+        deadline = time.monotonic() + self.deadline
+        shared = request_deadline.get()
+        if shared is not None:
+            deadline = min(deadline, shared)
+        for number in range(1, max_attempts + 1):
+            yield Attempt(self, number, max_attempts, deadline)
+
+
+retry_policy = RetryPolicy()
@@ -0,0 +1,159 @@
+import json
+import math
+import os
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from redis import RedisError
+
+from app.schemas.user import UserInfo
+from .breaker import mark_unavailable
+from .jwt import JWT
+
+
+class SessionStoreUnavailable(Exception):
+    """无法确认会话是否已被注销"""
+
+
+class SessionStore:
+    """登录会话：每次登录签发独立的会话 id（JWT sub），同一用户可在多个设备同时登录
+
+    session:user:{username}            → 哈希，会话 id → {"device", "ip", "createTime", "expireTime"}
+    session:revoked:{session_id}       → 已注销的会话，过期时间与 token 剩余有效期一致
+    session:revoked_before:{username}  → 该时间（秒）之前签发的 token 全部失效，用于注销全部会话
+
+    每个请求的吊销检查与用户信息缓存读取在同一次异步 Redis 往返中完成。
+    Redis 不可用时无法确认吊销状态，默认拒绝请求（503），避免已注销的 token 在故障期间重新生效；
+    SESSION_FAIL_OPEN=1 时改为放行，仅依赖 token 自身的签名与过期时间。
+    """
+    FAIL_OPEN = os.environ.get("SESSION_FAIL_OPEN", "0") == "1"
+    USER_PREFIX = "session:user:"
+    REVOKED_PREFIX = "session:revoked:"
+    REVOKED_BEFORE_PREFIX = "session:revoked_before:"
+    DEVICE_MAX_LENGTH = 200
+
+    def __init__(self, redis_client, user_cache, ttl: int, max_sessions: int):
+        self.r = redis_client
+        self.user_cache = user_cache
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+
+    def _remaining(self, expire_time: Optional[int]) -> int:
+        """会话剩余有效秒数，未知时按完整有效期计算"""
+        if expire_time is None:
+            return self.ttl
+        return math.ceil(expire_time / 1000 - time.time())
+
+    def _load(self, username: str, raw: Dict[str, str]) -> List[dict]:
+        """解析会话哈希并清理已过期的会话，按创建时间倒序返回"""
+        now = round(time.time() * 1000)
+        sessions, expired = [], []
+        for session_id, value in raw.items():
+            session = json.loads(value)
+            if session["expireTime"] <= now:
+                expired.append(session_id)
+                continue
+            session["sessionId"] = session_id
+            sessions.append(session)
+        if expired:
+            self.r.pipeline(("hdel", self.USER_PREFIX + username, *expired))
+        # 哈希按写入顺序返回，先稳定排序再整体反转，同一毫秒内创建的会话也按新到旧排列
+        sessions.sort(key=lambda item: item["createTime"])
+        return sessions[::-1]
+
+    def create(self, username: str, device: str = "", ip: str = "") -> str:
+        """新建会话并返回 access token；超过 max_sessions 时注销最早的会话"""
+        session_id = uuid.uuid4().hex
+        token = JWT.gen_access_token(username, self.ttl, session_id)
+        now = round(time.time() * 1000)
+        session = {
+            "device": (device or "")[:self.DEVICE_MAX_LENGTH],
+            "ip": ip or "",
+            "createTime": now,
+            "expireTime": now + self.ttl * 1000,
+        }
+        key = self.USER_PREFIX + username
+        try:
+            _, _, raw = self.r.pipeline(
+                ("hset", key, session_id, json.dumps(session)),
+                ("expire", key, self.ttl),
+                ("hgetall", key),
+            )
+            for stale in self._load(username, raw)[self.max_sessions:]:
+                self.revoke(username, stale["sessionId"], stale["expireTime"])
+        except RedisError as e:
+            # 未登记的会话仍可使用，只是不会出现在会话列表中
+            print(f"登记会话失败: {e}")
+        return token
+
+    async def authenticate(self, claims: dict) -> Tuple[bool, Optional[UserInfo]]:
+        """检查 token 对应的会话是否已被注销，同时读取用户信息缓存，返回 (会话有效, 用户信息)
+
+        Redis 不可用且未开启 FAIL_OPEN 时抛出 SessionStoreUnavailable，并使当前请求返回 503。
+        """
+        username = claims.get("name")
+        try:
+            user, (revoked, revoked_before) = await self.user_cache.get_with(
+                username,
+                ("exists", self.REVOKED_PREFIX + str(claims.get("sub"))),
+                ("get", self.REVOKED_BEFORE_PREFIX + username),
+            )
+        except RedisError as e:
+            print(f"检查会话状态失败: {e}")
+            if self.FAIL_OPEN:
+                return True, None
+            breaker = self.r.breaker
+            mark_unavailable("会话存储", breaker.retry_after() if breaker.state == breaker.OPEN else 1)
+            raise SessionStoreUnavailable(str(e))
+        if revoked or (revoked_before and claims.get("iat", 0) < int(revoked_before)):
+            return False, user
+        return True, user
+
+    def list_sessions(self, username: str) -> Optional[List[dict]]:
+        try:
+            return self._load(username, self.r.pipeline(("hgetall", self.USER_PREFIX + username))[0])
+        except RedisError as e:
+            print(f"读取会话列表失败: {e}")
+            return None
+
+    def revoke(self, username: str, session_id: str, expire_time: Optional[int] = None) -> bool:
+        """注销单个会话；expire_time 为会话过期时间（毫秒），未知时按完整有效期保留吊销记录"""
+        remaining = self._remaining(expire_time)
+        commands = [("hdel", self.USER_PREFIX + username, session_id)]
+        if remaining > 0:
+            commands.append(("set", self.REVOKED_PREFIX + session_id, "1", remaining))
+        try:
+            self.r.pipeline(*commands)
+            return True
+        except RedisError as e:
+            print(f"注销会话失败: {e}")
+            return False
+
+    def revoke_owned(self, username: str, session_id: str) -> bool:
+        """注销属于该用户的指定会话，会话不存在或不属于该用户时返回 False"""
+        sessions = self.list_sessions(username)
+        session = next((item for item in sessions or [] if item["sessionId"] == session_id), None)
+        if session is None:
+            return False
+        return self.revoke(username, session_id, session["expireTime"])
+
+    def revoke_all(self, username: str) -> Optional[int]:
+        """注销该用户的全部会话，返回被注销的已登记会话数
+
+        已登记的会话逐个吊销；revoked_before 兜底未登记的 token（如 Redis 故障期间签发的），
+        精确到秒，因此不影响注销之后同一秒内的新登录。
+        """
+        key = self.USER_PREFIX + username
+        try:
+            sessions = self._load(username, self.r.pipeline(("hgetall", key))[0])
+            commands = [("set", self.REVOKED_PREFIX + session["sessionId"], "1",
+                         self._remaining(session["expireTime"]))
+                        for session in sessions if self._remaining(session["expireTime"]) > 0]
+            commands.append(("set", self.REVOKED_BEFORE_PREFIX + username, int(time.time()), self.ttl))
+            commands.append(("delete", key))
+            self.r.pipeline(*commands)
+            return len(sessions)
+        except RedisError as e:
+            print(f"注销全部会话失败: {e}")
+            return None
@@ -0,0 +1,188 @@
+import os
+import random
+from typing import List, Optional
+
+from aiomysql import MySQLError
+
+from app.schemas.book import BookStats, CirculationStats, UserStats
+from . import async_db_manager
+from .retry import retry_policy
+
+_STATS_COLUMNS = "borrow_total, active_loans, returned_total, late_returns"
+_REBUILD_SELECT = "COUNT(*), SUM(is_return = 0), SUM(is_return = 1), SUM(is_return = 1 AND is_time_out = 1)"
+# 全表汇总时 circulate 可能为空，SUM 返回 NULL
+_SUMMARY_SELECT = ("COUNT(*), COALESCE(SUM(is_return = 0), 0), COALESCE(SUM(is_return = 1), 0), "
+                   "COALESCE(SUM(is_return = 1 AND is_time_out = 1), 0)")
+
+
+class Stats:
+    """借阅统计：book_stats / user_stats / library_stats 在借阅、归还事务内增量维护，读取均为主键或索引查询
+
+    全馆汇总 library_stats 拆成 SUMMARY_SHARDS 行，每次借阅、归还随机更新其中一行，读取时求和；
+    所有借还都要更新汇总，若只有一行，不同图书的借还会在这一行锁上排队。
+    单个分片的 active_loans 可能为负（借出与归还落在不同分片），只有各分片之和有意义。
+    事务内的更新顺序固定为 books → book_stats → user_stats → library_stats，避免死锁。
+    """
+    SUMMARY_SHARDS = int(os.environ.get("LIBRARY_STATS_SHARDS", 16))
+
+    def __init__(self):
+        self.db_manager = async_db_manager
+
+    @classmethod
+    def _summary_shard(cls) -> int:
+        return random.randrange(cls.SUMMARY_SHARDS)
+
+    @staticmethod
+    async def record_borrows(cursor, book_id: int, usernames: List[str]):
+        """在借阅事务内调用；须在更新 books 行之后执行，保持与归还相同的加锁顺序"""
+        await cursor.execute("""
+                       INSERT INTO book_stats (book_id, borrow_total, active_loans)
+                       VALUES (%s, %s, %s)
+                       ON DUPLICATE KEY UPDATE borrow_total = borrow_total + %s,
+                                               active_loans = active_loans + %s
+                       """, (book_id, len(usernames), len(usernames), len(usernames), len(usernames)))
+        await cursor.executemany("""
+                       INSERT INTO user_stats (username, borrow_total, active_loans)
+                       VALUES (%s, 1, 1)
+                       ON DUPLICATE KEY UPDATE borrow_total = borrow_total + 1,
+                                               active_loans = active_loans + 1
+                       """, [(username,) for username in usernames])
+        await cursor.execute("""
+                       INSERT INTO library_stats (id, borrow_total, active_loans)
+                       VALUES (%s, %s, %s)
+                       ON DUPLICATE KEY UPDATE borrow_total = borrow_total + %s,
+                                               active_loans = active_loans + %s
+                       """, (Stats._summary_shard(), len(usernames), len(usernames), len(usernames), len(usernames)))
+
+    @staticmethod
+    async def record_return(cursor, book_id: int, username: str, late: bool):
+        """在归还事务内调用"""
+        late = int(late)
+        for table, key, value in (("book_stats", "book_id", book_id), ("user_stats", "username", username)):
+            await cursor.execute(f"""
+                           UPDATE {table}
+                           SET active_loans   = active_loans - 1,
+                               returned_total = returned_total + 1,
+                               late_returns   = late_returns + %s
+                           WHERE {key} = %s
+                           """, (late, value))
+        await cursor.execute("""
+                       INSERT INTO library_stats (id, active_loans, returned_total, late_returns)
+                       VALUES (%s, -1, 1, %s)
+                       ON DUPLICATE KEY UPDATE active_loans   = active_loans - 1,
+                                               returned_total = returned_total + 1,
+                                               late_returns   = late_returns + %s
+                       """, (Stats._summary_shard(), late, late))
+
+    @staticmethod
+    def _fill(row: dict) -> dict:
+        # SUM() 返回 Decimal，统一转为 int
+        returned = int(row["returned_total"] or 0)
+        return {
+            "borrowTotal": int(row["borrow_total"] or 0),
+            "activeLoans": int(row["active_loans"] or 0),
+            "returnedTotal": returned,
+            "lateReturns": int(row["late_returns"] or 0),
+            "lateReturnRate": round(int(row["late_returns"] or 0) / returned, 4) if returned else 0.0,
+        }
+
+    async def _fetch(self, sql: str, params: tuple = (), action: str = "获取借阅统计") -> Optional[List[dict]]:
+        for attempt in retry_policy.attempts():
+            try:
+                async with self.db_manager.get_cursor(dictionary=True) as cursor:
+                    await cursor.execute(sql, params)
+                    return list(await cursor.fetchall())
+
+            except MySQLError as e:
+                print(f"{action}失败 (尝试 {attempt}): {e}")
+                if not await attempt.backoff_async(e):
+                    return None
+            except Exception as e:
+                print(f"{action}未知错误: {e}")
+                return None
+
+    async def get_book_stats(self, book_id: int) -> Optional[BookStats]:
+        rows = await self._fetch(f"SELECT book_id, {_STATS_COLUMNS} FROM book_stats WHERE book_id = %s",
+                                 (book_id,), "获取图书借阅统计")
+        if rows is None:
+            return None
+        row = rows[0] if rows else {"borrow_total": 0, "active_loans": 0, "returned_total": 0, "late_returns": 0}
+        return BookStats(bookId=book_id, **self._fill(row))
+
+    async def get_user_stats(self, username: str) -> Optional[UserStats]:
+        rows = await self._fetch(f"SELECT username, {_STATS_COLUMNS} FROM user_stats WHERE username = %s",
+                                 (username,), "获取用户借阅统计")
+        if rows is None:
+            return None
+        row = rows[0] if rows else {"borrow_total": 0, "active_loans": 0, "returned_total": 0, "late_returns": 0}
+        return UserStats(username=username, **self._fill(row))
+
+    async def get_top_books(self, limit: int = 10) -> Optional[List[BookStats]]:
+        """借阅次数最多的图书，按 borrow_total 索引倒序读取"""
+        rows = await self._fetch("""
+                           SELECT s.book_id, b.title, s.borrow_total, s.active_loans, s.returned_total, s.late_returns
+                           FROM book_stats s
+                                    LEFT JOIN books b ON b.book_id = s.book_id
+                           ORDER BY s.borrow_total DESC
+                           LIMIT %s
+                           """, (limit,), "获取热门图书")
+        if rows is None:
+            return None
+        return [BookStats(bookId=row["book_id"], title=row["title"], **self._fill(row)) for row in rows]
+
+    async def get_top_borrowers(self, limit: int = 10) -> Optional[List[UserStats]]:
+        """当前在借数量最多的用户"""
+        rows = await self._fetch(f"""
+                           SELECT username, {_STATS_COLUMNS}
+                           FROM user_stats
+                           ORDER BY active_loans DESC
+                           LIMIT %s
+                           """, (limit,), "获取在借用户排行")
+        if rows is None:
+            return None
+        return [UserStats(username=row["username"], **self._fill(row)) for row in rows]
+
+    async def get_summary(self) -> Optional[CirculationStats]:
+        """全馆汇总：对 library_stats 的各分片求和，与图书数量无关"""
+        rows = await self._fetch("""
+                           SELECT SUM(borrow_total)   AS borrow_total,
+                                  SUM(active_loans)   AS active_loans,
+                                  SUM(returned_total) AS returned_total,
+                                  SUM(late_returns)   AS late_returns
+                           FROM library_stats
+                           """, (), "获取借阅汇总")
+        if rows is None:
+            return None
+        row = rows[0] if rows else {"borrow_total": 0, "active_loans": 0, "returned_total": 0, "late_returns": 0}
+        return CirculationStats(**self._fill(row))
+
+    async def rebuild(self) -> bool:
+        """从 circulate 全量重算统计表，用于初始化或修复偏差"""
+        for attempt in retry_policy.attempts():
+            try:
+                async with self.db_manager.transaction() as cursor:
+                    await cursor.execute("DELETE FROM book_stats")
+                    await cursor.execute(f"""
+                                   INSERT INTO book_stats (book_id, {_STATS_COLUMNS})
+                                   SELECT book_id, {_REBUILD_SELECT} FROM circulate GROUP BY book_id
+                                   """)
+                    await cursor.execute("DELETE FROM user_stats")
+                    await cursor.execute(f"""
+                                   INSERT INTO user_stats (username, {_STATS_COLUMNS})
+                                   SELECT username, {_REBUILD_SELECT} FROM circulate GROUP BY username
+                                   """)
+                    # 汇总写入 0 号分片，其余分片清空
+                    await cursor.execute("DELETE FROM library_stats")
+                    await cursor.execute(f"""
+                                   INSERT INTO library_stats (id, {_STATS_COLUMNS})
+                                   SELECT 0, {_SUMMARY_SELECT} FROM circulate
+                                   """)
+                return True
+
+            except MySQLError as e:
+                print(f"重建借阅统计失败 (尝试 {attempt}): {e}")
+                if not await attempt.backoff_async(e):
+                    return False
+            except Exception as e:
+                print(f"未知错误: {e}")
+                return False
@@ -0,0 +1,188 @@
+import mimetypes
+import os
+import secrets
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Optional, List, Tuple
+
+import aiofiles
+from fastapi import Request
+from starlette.responses import FileResponse, Response, StreamingResponse
+
+
+class _FileResponse(FileResponse):
+    # 未走 pathsend 时 FileResponse 在线程池中分块读取，默认 64KB 块过小
+    chunk_size = 1024 * 1024
+
+
+class FileStreamer:
+    """支持 Range / 206 与 ETag / Last-Modified 条件请求的文件输出
+
+    FILE_DELIVERY_MODE=stream 通过 aiofiles 分块读入内存后输出（默认）
+    FILE_DELIVERY_MODE=file   交给 Starlette FileResponse，由它处理 Range / If-Range
+
+    两种模式都不是零拷贝：uvicorn 不提供 http.response.pathsend 扩展，FileResponse 同样在线程池中
+    按 1MB 分块读取后逐块发送（Range 请求即使在支持 pathsend 的服务器上也不走 pathsend），
+    吞吐与 CPU 开销和 stream 模式相当，见 benchmarks/bench_delivery.py。
+    """
+    CHUNK_SIZE = 1024 * 1024
+    MAX_RANGES = 16
+    MODE_STREAM = "stream"
+    MODE_FILE = "file"
+    DELIVERY_MODE: str = os.environ.get("FILE_DELIVERY_MODE", MODE_STREAM)
+
+    def __init__(self, file_path: Path, request: Request, media_type: Optional[str] = None,
+                 mode: Optional[str] = None):
+        self.file_path = file_path
+        self.request = request
+        self.mode = mode or self.DELIVERY_MODE
+        self.stat = stat = file_path.stat()
+        self.size = stat.st_size
+        self.mtime = int(stat.st_mtime)
+        self.etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        self.last_modified = formatdate(self.mtime, usegmt=True)
+        self.media_type = media_type or mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+
+    def _base_headers(self) -> dict:
+        return {
+            "Accept-Ranges": "bytes",
+            "ETag": self.etag,
+            "Last-Modified": self.last_modified,
+        }
+
+    def _not_modified(self) -> bool:
+        """If-None-Match 优先于 If-Modified-Since"""
+        if_none_match = self.request.headers.get("if-none-match")
+        if if_none_match is not None:
+            tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+            return "*" in tags or self.etag in tags
+
+        if_modified_since = self.request.headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                return self.mtime <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def _range_applicable(self) -> bool:
+        """If-Range 不匹配时忽略 Range，返回完整文件"""
+        if_range = self.request.headers.get("if-range")
+        if not if_range:
+            return True
+        if_range = if_range.strip()
+        if if_range.startswith('"') or if_range.startswith("W/"):
+            return if_range == self.etag
+        return if_range == self.last_modified
+
+    def _parse_range(self, header: str) -> Optional[List[Tuple[int, int]]]:
+        """解析 Range 头，返回合并后的闭区间列表；语法错误返回 None，无法满足返回空列表"""
+        unit, _, spec = header.partition("=")
+        if unit.strip().lower() != "bytes" or not spec:
+            return None
+
+        ranges = []
+        for part in spec.split(","):
+            start, sep, end = part.strip().partition("-")
+            if not sep:
+                return None
+            try:
+                if start:
+                    first = int(start)
+                    last = int(end) if end else self.size - 1
+                    if end and first > last:
+                        return None
+                else:
+                    suffix = int(end)
+                    if suffix == 0:
+                        continue
+                    first, last = max(self.size - suffix, 0), self.size - 1
+            except ValueError:
+                return None
+            if first < self.size:
+                ranges.append((first, min(last, self.size - 1)))
+
+        if len(ranges) > self.MAX_RANGES:
+            return None
+
+        ranges.sort()
+        merged: List[Tuple[int, int]] = []
+        for first, last in ranges:
+            if merged and first <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], last))
+            else:
+                merged.append((first, last))
+        return merged
+
+    async def _read_range(self, first: int, last: int):
+        async with aiofiles.open(self.file_path, mode="rb") as f:
+            await f.seek(first)
+            remaining = last - first + 1
+            while remaining > 0:
+                chunk = await f.read(min(self.CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    def _multipart_parts(self, ranges: List[Tuple[int, int]], boundary: str) -> List[bytes]:
+        return [
+            (f"--{boundary}\r\n"
+             f"Content-Type: {self.media_type}\r\n"
+             f"Content-Range: bytes {first}-{last}/{self.size}\r\n\r\n").encode("latin-1")
+            for first, last in ranges
+        ]
+
+    def response(self) -> Response:
+        headers = self._base_headers()
+
+        if self._not_modified():
+            return Response(status_code=304, headers=headers)
+
+        if self.mode == self.MODE_FILE:
+            # FileResponse 自行处理 Range / If-Range，并沿用这里的 ETag 与 Last-Modified
+            return _FileResponse(self.file_path, media_type=self.media_type, headers=headers,
+                                 stat_result=self.stat)
+
+        range_header = self.request.headers.get("range")
+        ranges = self._parse_range(range_header) if range_header and self._range_applicable() else None
+
+        if ranges is None:
+            headers["Content-Length"] = str(self.size)
+            return StreamingResponse(self._iter([(0, self.size - 1)]), media_type=self.media_type,
+                                     headers=headers)
+
+        if not ranges:
+            headers["Content-Range"] = f"bytes */{self.size}"
+            return Response(status_code=416, headers=headers)
+
+        if len(ranges) == 1:
+            first, last = ranges[0]
+            headers["Content-Range"] = f"bytes {first}-{last}/{self.size}"
+            headers["Content-Length"] = str(last - first + 1)
+            return StreamingResponse(self._iter(ranges), status_code=206, media_type=self.media_type,
+                                     headers=headers)
+
+        boundary = secrets.token_hex(16)
+        parts = self._multipart_parts(ranges, boundary)
+        closing = f"\r\n--{boundary}--\r\n".encode("latin-1")
+        length = sum(len(p) for p in parts) + sum(last - first + 1 for first, last in ranges)
+        length += 2 * (len(ranges) - 1) + len(closing)
+        headers["Content-Length"] = str(length)
+        return StreamingResponse(self._iter(ranges, parts, closing), status_code=206,
+                                 media_type=f"multipart/byteranges; boundary={boundary}", headers=headers)
+
+    async def _iter(self, ranges: List[Tuple[int, int]], parts: Optional[List[bytes]] = None,
+                    closing: bytes = b""):
+        try:
+            for i, (first, last) in enumerate(ranges):
+                if parts:
+                    if i:
+                        yield b"\r\n"
+                    yield parts[i]
+                async for chunk in self._read_range(first, last):
+                    yield chunk
+            if closing:
+                yield closing
+        except (ConnectionResetError, BrokenPipeError):
+            return
@@ -1,25 +1,43 @@
 from typing import Optional, Any
 
-from mysql.connector import Error as MySQLError
+from aiomysql import MySQLError
 
 from app.schemas.user import UserInfo, PhoneInfo
-from . import db_manager
+from . import async_db_manager, user_cache
+from .retry import retry_policy
 
 
 class User:
     def __init__(self, username: str):
         self.username = username
-        self.db_manager = db_manager
-
-    def select_by_username(self) -> Optional[UserInfo]:
+        self.db_manager = async_db_manager
+
+    async def select_cached(self) -> Optional[UserInfo]:
+        """优先从缓存读取用户信息，未命中时查询数据库并回填"""
+        user = await user_cache.get_async(self.username)
+        if user is not None:
+            return user
+        return await self.select_and_cache()
+
+    async def select_and_cache(self) -> Optional[UserInfo]:
+        """查询数据库并回填缓存"""
+        user = await self.select_by_username()
+        if user is not None:
+            await user_cache.set_async(user)
+        return user
+
+    def invalidate_cache(self):
+        """用户信息变更后使缓存失效"""
+        user_cache.invalidate(self.username)
+
+    async def select_by_username(self) -> Optional[UserInfo]:
         """根据用户名查询用户信息"""
-        max_retries = 3
-        for attempt in range(max_retries):
+        for attempt in retry_policy.attempts():
             try:
-                with self.db_manager.get_cursor(dictionary=True) as cursor:
+                async with self.db_manager.get_cursor(dictionary=True) as cursor:
                     sql = "SELECT username, email, permission, phone FROM users WHERE username = %s"
-                    cursor.execute(sql, (self.username,))
-                    result = cursor.fetchone()
+                    await cursor.execute(sql, (self.username,))
+                    result = await cursor.fetchone()
 
                     if not result:
                         return None
@@ -31,24 +49,22 @@ class User:
                         phone=str(result['phone'])
                     )
             except MySQLError as e:
-                print(f"查询用户信息失败 (尝试 {attempt + 1}/{max_retries}): {e}")
-                if attempt == max_retries - 1:
+                print(f"查询用户信息失败 (尝试 {attempt}): {e}")
+                if not await attempt.backoff_async(e):
                     raise e
-                continue
             except Exception as e:
                 print(f"未知错误: {e}")
                 raise e
 
-    def select_all(self) -> list[Any] | None:
+    async def select_all(self) -> list[Any] | None:
         """查询所有用户信息（仅管理员可用）"""
-        max_retries = 3
-        for attempt in range(max_retries):
+        for attempt in retry_policy.attempts():
             try:
-                with self.db_manager.get_cursor(dictionary=True) as cursor:
+                async with self.db_manager.get_cursor(dictionary=True) as cursor:
                     # 首先检查权限
                     sql = "SELECT permission FROM users WHERE username = %s"
-                    cursor.execute(sql, (self.username,))
-                    permission_result = cursor.fetchone()
+                    await cursor.execute(sql, (self.username,))
+                    permission_result = await cursor.fetchone()
 
                     if not permission_result:
                         return []
@@ -59,8 +75,8 @@ class User:
 
                     # 查询所有用户
                     sql = "SELECT username, email, permission, phone FROM users"
-                    cursor.execute(sql)
-                    results = cursor.fetchall()
+                    await cursor.execute(sql)
+                    results = await cursor.fetchall()
 
                     users = []
                     for row in results:
@@ -75,27 +91,25 @@ class User:
                     return users
 
             except MySQLError as e:
-                print(f"查询所有用户失败 (尝试 {attempt + 1}/{max_retries}): {e}")
-                if attempt == max_retries - 1:
+                print(f"查询所有用户失败 (尝试 {attempt}): {e}")
+                if not await attempt.backoff_async(e):
                     raise e
-                continue
             except Exception as e:
                 print(f"未知错误: {e}")
                 raise e
 
-    def get_phone_info(self) -> Optional[PhoneInfo]:
+    async def get_phone_info(self) -> Optional[PhoneInfo]:
         """获取用户手机信息"""
-        max_retries = 3
-        for attempt in range(max_retries):
+        for attempt in retry_policy.attempts():
             try:
-                with self.db_manager.get_cursor(dictionary=True) as cursor:
+                async with self.db_manager.get_cursor(dictionary=True) as cursor:
                     sql = """
                           SELECT phone, phone_verification_code, phone_code_expire_time, phone_verified
                           FROM users
                           WHERE username = %s \
                           """
-                    cursor.execute(sql, (self.username,))
-                    result = cursor.fetchone()
+                    await cursor.execute(sql, (self.username,))
+                    result = await cursor.fetchone()
 
                     if not result:
                         return None
@@ -111,10 +125,9 @@ class User:
                     )
 
             except MySQLError as e:
-                print(f"查询手机信息失败 (尝试 {attempt + 1}/{max_retries}): {e}")
-                if attempt == max_retries - 1:
+                print(f"查询手机信息失败 (尝试 {attempt}): {e}")
+                if not await attempt.backoff_async(e):
                     raise e
-                continue
             except Exception as e:
                 print(f"未知错误: {e}")
                 raise e
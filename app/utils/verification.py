@@ -0,0 +1,76 @@
+import json
+from typing import Optional
+
+from redis import RedisError
+
+
+class VerificationTokenStore:
+    """一次性验证 token 存储（Redis，按 TTL 过期）
+
+    {prefix}:token:{token}  → {"username", "email"}，验证时一次查询，成功后删除
+    {prefix}:user:{username} → 当前有效 token，重新签发时使旧 token 失效
+    {prefix}:resend:{username} → 重发限流标记
+
+    签发与作废各由一段 Lua 脚本原子完成，并发签发时不会留下两个有效 token。
+    """
+    # KEYS: token 键, 用户键；ARGV: 用户信息, token, 过期秒数, token 键前缀
+    ISSUE_SCRIPT = """
+    local previous = redis.call('GET', KEYS[2])
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+    redis.call('SET', KEYS[2], ARGV[2], 'EX', ARGV[3])
+    if previous and previous ~= ARGV[2] then
+        redis.call('DEL', ARGV[4] .. previous)
+    end
+    return 1
+    """
+    # KEYS: token 键, 用户键；ARGV: token
+    REVOKE_SCRIPT = """
+    redis.call('DEL', KEYS[1])
+    if redis.call('GET', KEYS[2]) == ARGV[1] then
+        redis.call('DEL', KEYS[2])
+    end
+    return 1
+    """
+
+    def __init__(self, redis_client, prefix: str, ttl: int, resend_interval: int):
+        self.r = redis_client
+        self.prefix = prefix
+        self.ttl = ttl
+        self.resend_interval = resend_interval
+        self._issue = redis_client.register_script(self.ISSUE_SCRIPT)
+        self._revoke = redis_client.register_script(self.REVOKE_SCRIPT)
+
+    def _token_key(self, token: str) -> str:
+        return f"{self.prefix}:token:{token}"
+
+    def _user_key(self, username: str) -> str:
+        return f"{self.prefix}:user:{username}"
+
+    def _resend_key(self, username: str) -> str:
+        return f"{self.prefix}:resend:{username}"
+
+    def issue(self, username: str, email: str, token: str, ttl: int = None) -> bool:
+        """签发 token，同一用户之前签发的 token 随之失效"""
+        ttl = ttl or self.ttl
+        try:
+            self._issue([self._token_key(token), self._user_key(username)],
+                        [json.dumps({"username": username, "email": email}), token, ttl, self._token_key("")])
+            return True
+        except RedisError as e:
+            print(f"保存验证 token 失败: {e}")
+            return False
+
+    def lookup(self, token: str) -> Optional[dict]:
+        """一次查询取得签发时的用户信息；不存在或已过期返回 None"""
+        raw = self.r.get(self._token_key(token))
+        return json.loads(raw) if raw else None
+
+    def revoke(self, token: str, username: str):
+        """验证成功后作废 token"""
+        self._revoke([self._token_key(token), self._user_key(username)], [token])
+
+    def throttle(self, username: str) -> int:
+        """重发限流：允许发送时返回 0，否则返回需要等待的秒数"""
+        if self.r.set_nx(self._resend_key(username), "1", self.resend_interval):
+            return 0
+        return max(self.r.ttl(self._resend_key(username)), 1)
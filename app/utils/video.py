@@ -1,16 +1,87 @@
+import asyncio
+import random
 import time
-from contextlib import contextmanager
+from array import array
+from contextlib import asynccontextmanager
 from typing import Optional, List
 
-from mysql.connector import Error as MySQLError
+from aiomysql import MySQLError
 
 from app.schemas.video import VideoInfo, VideoResponse
-from . import db_manager
+from . import async_db_manager
+from .retry import retry_policy
+
+
+class VideoSampler:
+    """视频 id 内存索引，按主键随机抽样以替代 ORDER BY RAND()"""
+    REFRESH_SECONDS = 30
+    FULL_REFRESH_SECONDS = 10 * 60
+
+    def __init__(self):
+        self.db_manager = async_db_manager
+        self.ids = array("q")
+        self._refreshed_at = 0.0
+        self._full_refreshed_at = 0.0
+        self._stale = True
+        self._lock = None
+
+    def mark_stale(self):
+        """下次抽样前强制全量刷新（如发现已删除的 id）"""
+        self._stale = True
+
+    async def refresh(self):
+        """按 TTL 刷新 id 列表：平时只增量拉取新 id，定期全量重建以剔除已删除的视频"""
+        now = time.monotonic()
+        full = self._stale or now - self._full_refreshed_at >= self.FULL_REFRESH_SECONDS
+        if not full and now - self._refreshed_at < self.REFRESH_SECONDS:
+            return
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            now = time.monotonic()
+            full = self._stale or now - self._full_refreshed_at >= self.FULL_REFRESH_SECONDS
+            if not full and now - self._refreshed_at < self.REFRESH_SECONDS:
+                return
+
+            last_id = 0 if full or not self.ids else self.ids[-1]
+            async with self.db_manager.get_cursor(dictionary=False) as cursor:
+                await cursor.execute("SELECT id FROM video WHERE id > %s ORDER BY id", (last_id,))
+                rows = await cursor.fetchall()
+
+            new_ids = array("q", (row[0] for row in rows))
+            if full:
+                self.ids = new_ids
+                self._full_refreshed_at = now
+                self._stale = False
+            else:
+                self.ids.extend(new_ids)
+            self._refreshed_at = now
+
+    async def count(self) -> int:
+        await self.refresh()
+        return len(self.ids)
+
+    async def sample(self, n: int, exclude_id: Optional[int] = None) -> List[int]:
+        """抽取 n 个互不相同的 id，可排除指定 id"""
+        await self.refresh()
+        ids = self.ids
+        n = min(n, len(ids) - (1 if exclude_id is not None else 0))
+        picked = set()
+        while len(picked) < n:
+            vid = ids[random.randrange(len(ids))]
+            if vid != exclude_id:
+                picked.add(vid)
+        return list(picked)
+
+
+video_sampler = VideoSampler()
 
 
 class Video:
     def __init__(self):
-        self.db_manager = db_manager
+        self.db_manager = async_db_manager
+        self.sampler = video_sampler
 
     def __row_to_videoinfo(self, row: dict, url: str) -> VideoInfo:
         """将数据库行转换为 VideoInfo 对象"""
@@ -22,29 +93,27 @@ class Video:
             comment=row['comment']
         )
 
-    @contextmanager
-    def _execute_query(self, sql: str, params: tuple = None):
+    @asynccontextmanager
+    async def _execute_query(self, sql: str, params: tuple = None):
         """执行查询的上下文管理器"""
-        max_retries = 3
-        for attempt in range(max_retries):
+        for attempt in retry_policy.attempts():
             try:
-                with self.db_manager.get_cursor(dictionary=True) as cursor:
-                    cursor.execute(sql, params or ())
+                async with self.db_manager.get_cursor(dictionary=True) as cursor:
+                    await cursor.execute(sql, params or ())
                     yield cursor
                 break
             except MySQLError as e:
-                print(f"数据库查询失败 (尝试 {attempt + 1}/{max_retries}): {e}")
-                if attempt == max_retries - 1:
+                print(f"数据库查询失败 (尝试 {attempt}): {e}")
+                if not await attempt.backoff_async(e):
                     raise e
-                time.sleep(1)
             except Exception as e:
                 print(f"未知错误: {e}")
                 raise e
 
-    def get_random_video(self, url: str, filename: Optional[str] = None) -> Optional[VideoResponse]:
+    async def get_random_video(self, url: str, filename: Optional[str] = None) -> Optional[VideoResponse]:
         """获取随机视频"""
         try:
-            total = self._get_video_count()
+            total = await self.sampler.count()
             if total == 0:
                 return None
 
@@ -52,16 +121,15 @@ class Video:
             res: List[VideoInfo] = []
 
             if filename and total > 1:
-                current_video = self._get_video_by_filename(filename, url)
-                if not current_video:
+                current_row = await self._get_video_row_by_filename(filename)
+                if not current_row:
                     return None
-                res.append(current_video)
+                res.append(self.__row_to_videoinfo(current_row, url))
 
-                next_video = self._get_random_video_exclude(filename, url)
-                if next_video:
-                    res.append(next_video)
+                next_videos = await self._get_random_videos(1, url, exclude_id=current_row['id'])
+                res.extend(next_videos)
             else:
-                random_videos = self._get_random_videos(video_num, url)
+                random_videos = await self._get_random_videos(video_num, url)
                 if not random_videos:
                     return None
                 res = random_videos
@@ -78,50 +146,48 @@ class Video:
             print(f"获取随机视频失败: {e}")
             return None
 
-    def _get_video_count(self) -> int:
-        """获取视频总数"""
-        with self._execute_query("SELECT COUNT(*) as count FROM video") as cursor:
-            result = cursor.fetchone()
-            return result['count'] if result else 0
-
-    def _get_video_by_filename(self, filename: str, url: str) -> Optional[VideoInfo]:
-        """根据文件名获取视频"""
-        with self._execute_query("SELECT * FROM video WHERE video = %s", (filename,)) as cursor:
-            row = cursor.fetchone()
-            return self.__row_to_videoinfo(row, url) if row else None
-
-    def _get_random_video_exclude(self, exclude_filename: str, url: str) -> Optional[VideoInfo]:
-        """获取排除指定文件名外的随机视频"""
-        with self._execute_query(
-                "SELECT * FROM video WHERE video <> %s ORDER BY RAND() LIMIT 1",
-                (exclude_filename,)
-        ) as cursor:
-            row = cursor.fetchone()
-            return self.__row_to_videoinfo(row, url) if row else None
-
-    def _get_random_videos(self, limit: int, url: str) -> List[VideoInfo]:
-        """获取多个随机视频"""
-        with self._execute_query(
-                "SELECT * FROM video ORDER BY RAND() LIMIT %s",
-                (limit,)
-        ) as cursor:
-            rows = cursor.fetchall()
-            return [self.__row_to_videoinfo(row, url) for row in rows] if rows else []
-
-    def get_video_by_id(self, video_id: str, url: str) -> Optional[VideoInfo]:
+    async def _get_video_row_by_filename(self, filename: str) -> Optional[dict]:
+        """根据文件名获取视频行"""
+        async with self._execute_query("SELECT * FROM video WHERE video = %s", (filename,)) as cursor:
+            return await cursor.fetchone()
+
+    async def _get_videos_by_ids(self, ids: List[int]) -> List[dict]:
+        """按主键批量获取视频行"""
+        if not ids:
+            return []
+        placeholders = ", ".join(["%s"] * len(ids))
+        async with self._execute_query(f"SELECT * FROM video WHERE id IN ({placeholders})", tuple(ids)) as cursor:
+            rows = await cursor.fetchall()
+        order = {vid: i for i, vid in enumerate(ids)}
+        return sorted(rows, key=lambda row: order[row['id']])
+
+    async def _get_random_videos(self, limit: int, url: str, exclude_id: Optional[int] = None) -> List[VideoInfo]:
+        """按主键随机抽取多个互不相同的视频，可排除当前视频"""
+        ids = await self.sampler.sample(limit, exclude_id)
+        rows = await self._get_videos_by_ids(ids)
+        if len(rows) < len(ids):
+            # 抽中了已删除的视频，补抽一次并在下次请求前全量刷新
+            self.sampler.mark_stale()
+            found = {row['id'] for row in rows}
+            retry_ids = [vid for vid in await self.sampler.sample(limit + len(ids), exclude_id)
+                         if vid not in found][:len(ids) - len(rows)]
+            rows.extend(await self._get_videos_by_ids(retry_ids))
+        return [self.__row_to_videoinfo(row, url) for row in rows]
+
+    async def get_video_by_id(self, video_id: str, url: str) -> Optional[VideoInfo]:
         """根据视频ID获取视频信息"""
         try:
-            with self._execute_query("SELECT * FROM video WHERE video = %s", (video_id,)) as cursor:
-                row = cursor.fetchone()
+            async with self._execute_query("SELECT * FROM video WHERE video = %s", (video_id,)) as cursor:
+                row = await cursor.fetchone()
                 return self.__row_to_videoinfo(row, url) if row else None
         except Exception as e:
             print(f"根据ID获取视频失败: {e}")
             return None
 
-    def increment_like_count(self, video_id: str) -> bool:
+    async def increment_like_count(self, video_id: str) -> bool:
         """增加视频点赞数"""
         try:
-            with self._execute_query(
+            async with self._execute_query(
                     "UPDATE video SET `like` = `like` + 1 WHERE video = %s",
                     (video_id,)
             ) as cursor:
@@ -130,10 +196,10 @@ class Video:
             print(f"增加点赞数失败: {e}")
             return False
 
-    def increment_comment_count(self, video_id: str) -> bool:
+    async def increment_comment_count(self, video_id: str) -> bool:
         """增加视频评论数"""
         try:
-            with self._execute_query(
+            async with self._execute_query(
                     "UPDATE video SET comment = comment + 1 WHERE video = %s",
                     (video_id,)
             ) as cursor:
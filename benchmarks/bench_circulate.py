@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""借阅历史查询：OFFSET 分页 vs (borrow_time, id) 键集分页
+
+需要已执行 migrations/003_circulate_history_indexes.sql 的 MySQL（读取 .env）。
+--populate 会向 circulate 表写入合成数据，请只在测试库上使用。
+用法: python -m benchmarks.bench_circulate [--populate 10000000] [翻页数]
+"""
+import asyncio
+import random
+import sys
+import time
+
+from app.utils import async_db_manager
+from app.utils.book import Book
+
+PAGE = 20
+USERS = [f"bench_user{i}" for i in range(10000)]
+
+
+async def populate(n: int, batch: int = 10000):
+    rng = random.Random(42)
+    now = int(time.time() * 1000)
+    sql = """
+          INSERT INTO circulate (book_id, borrow_long, borrow_time, username, is_time_out, is_return, return_time)
+          VALUES (%s, %s, %s, %s, %s, %s, %s) \
+          """
+    for offset in range(0, n, batch):
+        rows = []
+        for _ in range(min(batch, n - offset)):
+            borrow_time = now - rng.randint(0, 3 * 365 * 86400000)
+            returned = rng.random() < 0.9
+            rows.append((rng.randint(100001, 200000), rng.choice([7, 14, 30]), borrow_time, rng.choice(USERS),
+                         int(rng.random() < 0.1), int(returned), borrow_time + 86400000 if returned else None))
+        async with async_db_manager.transaction(dictionary=False) as cursor:
+            await cursor.executemany(sql, rows)
+        print(f"\r已写入 {min(offset + batch, n):,}/{n:,}", end="", flush=True)
+    print()
+
+
+async def offset_page(page: int, username: str = None):
+    where, params = ("WHERE username = %s ", [username]) if username else ("", [])
+    async with async_db_manager.get_cursor() as cursor:
+        await cursor.execute(f"SELECT * FROM circulate {where}ORDER BY borrow_time DESC LIMIT %s OFFSET %s",
+                             (*params, PAGE, page * PAGE))
+        return await cursor.fetchall()
+
+
+async def walk(name: str, pages: int, fetch):
+    start = time.perf_counter()
+    last = 0.0
+    for page in range(pages):
+        t = time.perf_counter()
+        await fetch(page)
+        last = time.perf_counter() - t
+    total = time.perf_counter() - start
+    print(f"{name:>22}: {pages} 页共 {total * 1000:.0f} ms, 第 {pages} 页 {last * 1000:.1f} ms")
+
+
+async def main(args: list[str]):
+    try:
+        if args and args[0] == "--populate":
+            await populate(int(args[1]))
+            args = args[2:]
+        pages = int(args[0]) if args else 200
+
+        state = {"cursor": None}
+
+        async def keyset(_page, username="admin", permission=0, **filters):
+            result = await Book().get_circulate_page(username, permission, state["cursor"], PAGE, **filters)
+            state["cursor"] = result[1]
+
+        await walk("管理员 OFFSET", pages, offset_page)
+        await walk("管理员 键集", pages, keyset)
+
+        state["cursor"] = None
+        await walk("管理员 未归还 键集", pages, lambda p: keyset(p, is_return=False))
+
+        user = USERS[0]
+        await walk("单用户 OFFSET", min(pages, 20), lambda p: offset_page(p, user))
+        state["cursor"] = None
+        await walk("单用户 键集", min(pages, 20), lambda p: keyset(p, user, 4))
+    finally:
+        await async_db_manager.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:]))
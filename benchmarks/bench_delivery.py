@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""静态文件两种输出模式（stream / file）的吞吐与每 GB CPU 开销
+
+服务端使用 uvicorn（不支持 pathsend），两种模式都是线程池分块读取，预期结果相近。
+服务端在子进程中运行，CPU 时间取自 /proc/<pid>/stat（仅限 Linux）。
+用法: python -m benchmarks.bench_delivery [文件大小MB] [下载次数]
+"""
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+HOST = "127.0.0.1"
+
+
+def serve(mode: str, directory: str, port: int):
+    import uvicorn
+    from fastapi import FastAPI, Request
+
+    from app.utils.stream import FileStreamer
+
+    app = FastAPI()
+
+    @app.get("/{filename}")
+    async def file(request: Request, filename: str):
+        return FileStreamer(Path(directory) / filename, request, mode=mode).response()
+
+    uvicorn.run(app, host=HOST, port=port, log_level="warning")
+
+
+def cpu_seconds(pid: int) -> float:
+    fields = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind((HOST, 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(port: int):
+    for _ in range(100):
+        try:
+            with socket.create_connection((HOST, port), timeout=0.1):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("服务启动超时")
+
+
+def measure(mode: str, directory: str, size: int, rounds: int):
+    port = free_port()
+    server = subprocess.Popen([sys.executable, "-m", "benchmarks.bench_delivery", "serve", mode, directory, str(port)])
+    try:
+        wait_ready(port)
+        url = f"http://{HOST}:{port}/blob.bin"
+        cpu_before, start = cpu_seconds(server.pid), time.perf_counter()
+        for _ in range(rounds):
+            with urllib.request.urlopen(url) as resp:
+                while resp.read(1024 * 1024):
+                    pass
+        elapsed, cpu = time.perf_counter() - start, cpu_seconds(server.pid) - cpu_before
+        gb = size * rounds / 1024 ** 3
+        print(f"{mode:>8}: {gb / elapsed * 1024:,.0f} MB/s, 服务端 CPU {cpu / gb:.2f} 秒/GB")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main(size_mb: int, rounds: int):
+    with tempfile.TemporaryDirectory() as directory:
+        size = size_mb * 1024 * 1024
+        with open(Path(directory) / "blob.bin", "wb") as f:
+            f.write(os.urandom(size))
+        for mode in ("stream", "file"):
+            measure(mode, directory, size, rounds)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        serve(sys.argv[2], sys.argv[3], int(sys.argv[4]))
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 256, int(sys.argv[2]) if len(sys.argv) > 2 else 8)
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""JWT.parse_claim 冷/热解码吞吐对比
+
+用法: python -m benchmarks.bench_jwt [次数]
+"""
+import sys
+import time
+
+from app.utils.jwt import JWT
+
+
+def run(n: int):
+    tokens = [JWT.gen_access_token(f"user{i}") for i in range(n)]
+
+    JWT.clear_cache()
+    start = time.perf_counter()
+    for token in tokens:
+        JWT.parse_claim(token)
+    cold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for token in tokens:
+        JWT.parse_claim(token)
+    warm = time.perf_counter() - start
+
+    print(f"冷解码: {n / cold:,.0f} 次/秒 ({cold / n * 1e6:.1f} us/次)")
+    print(f"热解码: {n / warm:,.0f} 次/秒 ({warm / n * 1e6:.1f} us/次)")
+    print(f"加速比: {cold / warm:.1f}x")
+    print(f"缓存统计: {JWT.cache_stats()}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
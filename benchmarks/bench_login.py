@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""登录路径的连接池占用与延迟：旧的两次查询 vs 单次查询
+
+需要可用的 MySQL（读取 .env）以及一个已存在的账号。
+用法: python -m benchmarks.bench_login <用户名> <明文密码> [并发数] [轮数]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+from app.utils import async_db_manager
+from app.utils.login import Login
+from app.utils.rsa import RSA
+from app.utils.user import User
+
+
+class LegacyLogin(Login):
+    """旧实现：持有第一条连接的同时再为 UserInfo 取第二条连接"""
+
+    async def login(self):
+        async with self.db_manager.get_cursor(dictionary=True) as cursor:
+            sql = "SELECT username, password, salt FROM users WHERE username = %s"
+            await cursor.execute(sql, (self.username,))
+            result = await cursor.fetchone()
+            if not result or not await self._verify_password(result):
+                return None
+            return await User(self.username).select_by_username()
+
+
+async def sample_pool(stop: asyncio.Event, peaks: list):
+    pool = async_db_manager.connection_pool
+    while not stop.is_set():
+        peaks.append(pool.size - pool.freesize)
+        await asyncio.sleep(0.001)
+
+
+async def measure(cls, username: str, password: str, concurrency: int, rounds: int):
+    latencies = []
+
+    async def one():
+        start = time.perf_counter()
+        user = await cls(username, password).login()
+        latencies.append(time.perf_counter() - start)
+        assert user is not None, "登录失败，请检查账号密码"
+
+    stop, in_use = asyncio.Event(), []
+    sampler = asyncio.create_task(sample_pool(stop, in_use))
+    for _ in range(rounds):
+        await asyncio.gather(*(one() for _ in range(concurrency)))
+    stop.set()
+    await sampler
+
+    latencies.sort()
+    print(f"{cls.__name__:>12}: p50 {statistics.median(latencies) * 1000:.2f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.2f} ms, "
+          f"连接池平均占用 {statistics.mean(in_use):.2f}, 峰值 {max(in_use)}")
+
+
+async def main(username: str, password: str, concurrency: int, rounds: int):
+    encrypted = RSA().encrypt_by_public(password)
+    await Login(username, encrypted).login()
+    try:
+        for cls in (LegacyLogin, Login):
+            await measure(cls, username, encrypted, concurrency, rounds)
+    finally:
+        await async_db_manager.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(
+        sys.argv[1], sys.argv[2],
+        int(sys.argv[3]) if len(sys.argv) > 3 else 8,
+        int(sys.argv[4]) if len(sys.argv) > 4 else 50,
+    ))
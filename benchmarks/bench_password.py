@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""密码哈希吞吐：旧 SHA-256 格式 vs scrypt，单核与专用线程池
+
+不依赖数据库。每秒登录数的上限约等于 scrypt 校验次数/秒（RSA 解密另计，见 bench_rsa.py）。
+用法: python -m benchmarks.bench_password [并发数] [秒数]
+"""
+import asyncio
+import os
+import sys
+import time
+
+from app.utils.password import PasswordEncryption
+
+PASSWORD = "correct horse battery staple"
+
+
+def rate(func, seconds: float) -> float:
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        func()
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+async def pooled_rate(stored: str, concurrency: int, seconds: float) -> float:
+    count = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+
+    async def worker():
+        nonlocal count
+        while time.perf_counter() < deadline:
+            assert await PasswordEncryption.verify_async(PASSWORD, stored)
+            count += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    # 截止前提交的任务在截止后才完成，按实际耗时计算
+    return count / (time.perf_counter() - start)
+
+
+def main(concurrency: int, seconds: float):
+    cores = os.cpu_count() or 1
+    legacy = PasswordEncryption.legacy_hash(PASSWORD, "SALT1234")
+    print(f"CPU 核数: {cores}，哈希线程数: {PasswordEncryption.HASH_WORKERS}")
+    print(f"旧格式 SHA-256     单核: {rate(lambda: PasswordEncryption.verify_password(PASSWORD, legacy, 'SALT1234'), seconds):>10.0f} 次/秒")
+
+    for ln in (13, 14, 15):
+        PasswordEncryption.SCRYPT_LN = ln
+        stored, _ = PasswordEncryption.hash_password(PASSWORD)
+        single = rate(lambda: PasswordEncryption.verify_password(PASSWORD, stored), seconds)
+        memory = 128 * (1 << ln) * PasswordEncryption.SCRYPT_R * PasswordEncryption.SCRYPT_P >> 20
+        print(f"scrypt ln={ln} ({memory:>2} MiB) 单核: {single:>10.1f} 次/秒  ({1000 / single:.1f} ms/次)")
+
+    PasswordEncryption.SCRYPT_LN = int(os.environ.get("PASSWORD_SCRYPT_LN", 14))
+    stored, _ = PasswordEncryption.hash_password(PASSWORD)
+    pooled = asyncio.run(pooled_rate(stored, concurrency, seconds))
+    print(f"scrypt ln={PasswordEncryption.SCRYPT_LN} 线程池 并发 {concurrency}: {pooled:>8.1f} 次/秒"
+          f"（每核 {pooled / min(cores, PasswordEncryption.HASH_WORKERS):.1f}）")
+    PasswordEncryption.shutdown_executor()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 32, float(args[1]) if len(args) > 1 else 2)
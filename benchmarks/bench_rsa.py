@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""RSA 私钥解密吞吐：单进程 vs 多进程解密池
+
+用法: RSA_DECRYPT_WORKERS=4 python -m benchmarks.bench_rsa [次数]
+"""
+import asyncio
+import sys
+import time
+
+from app.utils.rsa import RSA
+
+
+async def decrypt_all(rsa: RSA, ciphertexts: list[str]):
+    return await asyncio.gather(*(rsa.decrypt_by_private_async(c) for c in ciphertexts))
+
+
+def run(n: int):
+    rsa = RSA()
+    ciphertexts = [rsa.encrypt_by_public(f"password{i}") for i in range(n)]
+
+    start = time.perf_counter()
+    for c in ciphertexts:
+        rsa.decrypt_by_private(c)
+    single = time.perf_counter() - start
+    print(f"单进程: {n / single:,.0f} 次/秒")
+
+    if not RSA.start_decrypt_pool():
+        print("未设置 RSA_DECRYPT_WORKERS，跳过进程池测试")
+        return
+    try:
+        asyncio.run(decrypt_all(rsa, ciphertexts[:RSA.DECRYPT_WORKERS]))
+        start = time.perf_counter()
+        results = asyncio.run(decrypt_all(rsa, ciphertexts))
+        pooled = time.perf_counter() - start
+        assert results == [f"password{i}" for i in range(n)]
+        print(f"进程池 ({RSA.DECRYPT_WORKERS} 进程): {n / pooled:,.0f} 次/秒, 加速比 {single / pooled:.1f}x")
+    finally:
+        RSA.shutdown_decrypt_pool()
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
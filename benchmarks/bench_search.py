@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""图书检索：LIKE '%kw%' 全表扫描 vs FULLTEXT ngram 索引
+
+需要已执行 migrations/002_books_fulltext.sql 的 MySQL（读取 .env）。
+--populate 会向 books 表写入合成数据，请只在测试库上使用。
+用法: python -m benchmarks.bench_search [--populate 1000000] [查询轮数]
+"""
+import asyncio
+import random
+import sys
+import time
+
+from app.schemas.book import AddBookRequest
+from app.utils import async_db_manager
+from app.utils.book import Book
+
+WORDS = ["三体", "红楼", "算法", "数据", "历史", "宇宙", "编程", "小说", "哲学", "经济",
+         "百年", "孤独", "时间", "简史", "人类", "文明", "战争", "和平", "科学", "艺术"]
+AUTHORS = ["刘慈欣", "曹雪芹", "余华", "莫言", "鲁迅", "钱钟书", "张爱玲", "老舍"]
+KEYWORDS = ["三体", "算法", "人类文明", "孤独", "余华"]
+
+
+def synthetic_book(rng: random.Random) -> AddBookRequest:
+    return AddBookRequest(
+        title="".join(rng.sample(WORDS, 3)),
+        author=rng.choice(AUTHORS),
+        description="".join(rng.choices(WORDS, k=20)),
+        pic="default.jpg",
+        type=rng.choice(["文学", "科技", "历史"]),
+        price=rng.randint(10, 200),
+        count=rng.randint(1, 10),
+    )
+
+
+async def populate(n: int, batch: int = 5000):
+    rng = random.Random(42)
+    for offset in range(0, n, batch):
+        await Book().add_book([synthetic_book(rng) for _ in range(min(batch, n - offset))])
+        print(f"\r已写入 {min(offset + batch, n):,}/{n:,}", end="", flush=True)
+    print()
+
+
+async def like_search(keyword: str):
+    async with async_db_manager.get_cursor() as cursor:
+        pattern = f"%{keyword}%"
+        await cursor.execute(
+            "SELECT * FROM books WHERE title LIKE %s OR author LIKE %s OR description LIKE %s LIMIT 21",
+            (pattern, pattern, pattern))
+        return await cursor.fetchall()
+
+
+async def timed(name: str, func, rounds: int):
+    latencies = []
+    for _ in range(rounds):
+        for keyword in KEYWORDS:
+            start = time.perf_counter()
+            await func(keyword)
+            latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    print(f"{name:>9}: p50 {latencies[len(latencies) // 2] * 1000:.1f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f} ms")
+
+
+async def main(args: list[str]):
+    try:
+        if args and args[0] == "--populate":
+            await populate(int(args[1]))
+            args = args[2:]
+        rounds = int(args[0]) if args else 20
+        async with async_db_manager.get_cursor(dictionary=False) as cursor:
+            await cursor.execute("SELECT COUNT(*) FROM books")
+            print(f"books 行数: {(await cursor.fetchone())[0]:,}")
+        await timed("LIKE", like_search, rounds)
+        await timed("FULLTEXT", lambda kw: Book().search_books(kw), rounds)
+    finally:
+        await async_db_manager.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:]))
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""会话吊销检查对认证请求延迟与事件循环的影响（并发）
+
+在同一个事件循环中并发执行 get_current_user 的缓存读取部分（不含 JWT 解码），
+同时用一个心跳协程每 1ms 醒来一次，统计它实际被推迟的时间（事件循环阻塞）：
+  仅读用户缓存            旧实现，进程内命中时不访问 Redis
+  吊销检查（同步客户端）  与用户缓存读取合并为一次流水线，但使用阻塞的 redis-py 客户端
+  吊销检查（异步客户端）  SessionStore.authenticate，redis.asyncio 流水线
+
+每种方式分别测进程内用户缓存命中与未命中两种情况。结果取决于到 Redis 的网络往返，
+应在与生产环境相近的网络下运行。
+需要可用的 Redis（读取 .env），会写入并在结束时清理 bench_session_user 的缓存与会话。
+用法: python -m benchmarks.bench_session [每种方式的请求数] [并发数]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+from app.schemas.user import UserInfo
+from app.utils import r, session_store, user_cache
+from app.utils.jwt import JWT
+
+USERNAME = "bench_session_user"
+
+
+def percentile(values: list, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+async def heartbeat(stop: asyncio.Event, lags: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lags.append(time.perf_counter() - start - 0.001)
+
+
+async def measure(label: str, n: int, concurrency: int, func, cold: bool):
+    latencies, lags = [], []
+    queue = iter(range(n))
+
+    async def worker():
+        for _ in queue:
+            if cold:
+                user_cache.local.delete(USERNAME)
+            start = time.perf_counter()
+            await func()
+            latencies.append(time.perf_counter() - start)
+
+    stop = asyncio.Event()
+    beat = asyncio.create_task(heartbeat(stop, lags))
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await beat
+
+    print(f"  {label}: {n / elapsed:8,.0f} 次/秒  "
+          f"延迟 p50 {statistics.median(latencies) * 1e3:6.2f} ms  p99 {percentile(latencies, 0.99) * 1e3:6.2f} ms  "
+          f"事件循环阻塞 p99 {percentile(lags, 0.99) * 1e3:6.2f} ms  最大 {max(lags) * 1e3:6.2f} ms")
+
+
+async def run(n: int, concurrency: int):
+    await user_cache.set_async(UserInfo(username=USERNAME, email="bench@example.com", permission=4, phone="0"))
+    claims = JWT.parse_claim(session_store.create(USERNAME, device="bench"))
+    commands = (
+        ("exists", session_store.REVOKED_PREFIX + claims["sub"]),
+        ("get", session_store.REVOKED_BEFORE_PREFIX + USERNAME),
+    )
+
+    async def cache_only():
+        await user_cache.get_async(USERNAME)
+
+    async def blocking():
+        # 旧写法：在事件循环中直接调用同步客户端
+        user = user_cache.local.get(USERNAME)
+        prefix = () if user is not None else (("get", user_cache.KEY_PREFIX + USERNAME),)
+        r.pipeline(*prefix, *commands)
+
+    async def pipelined():
+        await session_store.authenticate(claims)
+
+    try:
+        for cold in (False, True):
+            print("进程内用户缓存未命中" if cold else "进程内用户缓存命中", f"（并发 {concurrency}）")
+            await measure("仅读用户缓存          ", n, concurrency, cache_only, cold)
+            await measure("吊销检查（同步客户端）", n, concurrency, blocking, cold)
+            await measure("吊销检查（异步客户端）", n, concurrency, pipelined, cold)
+
+        assert (await session_store.authenticate(claims))[0]
+        session_store.revoke_all(USERNAME)
+        assert not (await session_store.authenticate(claims))[0]
+        print("注销全部会话后 token 已失效")
+    finally:
+        session_store.revoke_all(USERNAME)
+        r.delete(session_store.REVOKED_BEFORE_PREFIX + USERNAME)
+        user_cache.invalidate(USERNAME)
+        await r.close_async()
+
+
+if __name__ == "__main__":
+    asyncio.run(run(int(sys.argv[1]) if len(sys.argv) > 1 else 5000,
+                    int(sys.argv[2]) if len(sys.argv) > 2 else 50))
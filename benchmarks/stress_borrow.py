@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""并发借阅压力测试：对同一本书并发发起大量借阅，校验不会超借
+
+会在 books / circulate 表中写入并清理测试数据，请只在测试库上使用。
+用法: python -m benchmarks.stress_borrow [库存] [并发借阅数]
+"""
+import asyncio
+import sys
+import time
+
+from app.schemas.book import AddBookRequest
+from app.utils import async_db_manager
+from app.utils.book import Book
+
+USERNAME = "stress_borrow"
+
+
+async def main(stock: int, attempts: int):
+    result = await Book().add_book([AddBookRequest(
+        title="并发借阅压测", author="bench", description="", pic="", type="bench", price=0, count=stock
+    )])
+    assert result is not None, "创建测试图书失败"
+    book_id = result.firstBookId
+
+    try:
+        start = time.perf_counter()
+        outcomes = await asyncio.gather(*(
+            Book(book_id).borrow_book(1, USERNAME) for _ in range(attempts)
+        ))
+        elapsed = time.perf_counter() - start
+
+        async with async_db_manager.get_cursor() as cursor:
+            await cursor.execute("SELECT borrow_count, count FROM books WHERE book_id=%s", (book_id,))
+            book = await cursor.fetchone()
+            await cursor.execute("SELECT COUNT(*) AS n FROM circulate WHERE book_id=%s", (book_id,))
+            loans = (await cursor.fetchone())["n"]
+
+        granted = sum(1 for ok in outcomes if ok)
+        print(f"{attempts} 次并发借阅，库存 {stock}: 成功 {granted}, 耗时 {elapsed:.2f}s "
+              f"({attempts / elapsed:,.0f} 次/秒)")
+        print(f"books.borrow_count={book['borrow_count']}, circulate 记录数={loans}")
+        assert granted == stock, "成功借阅数与库存不符"
+        assert book["borrow_count"] == stock, "borrow_count 超出库存"
+        assert loans == stock, "借阅记录数与成功数不符"
+        print("未发生超借")
+    finally:
+        async with async_db_manager.get_cursor() as cursor:
+            await cursor.execute("DELETE FROM circulate WHERE book_id=%s", (book_id,))
+            await cursor.execute("DELETE FROM books WHERE book_id=%s", (book_id,))
+        await async_db_manager.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 50,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 5000,
+    ))
@@ -1,11 +1,37 @@
 # -*- coding: utf-8 -*-
+from contextlib import asynccontextmanager
 
 import uvicorn
 from fastapi import FastAPI
 
+from app.middleware import LoadShedMiddleware
 from app.routers import user, book, pic, video, rsa
+from app.utils import async_db_manager, r
+from app.utils.bloom import registration_index
+from app.utils.outbox import email_outbox
+from app.utils.overdue import overdue_sweeper
+from app.utils.password import PasswordEncryption
+from app.utils.rsa import RSA
 
-app = FastAPI(title="图书管理系统")
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    RSA.start_decrypt_pool()
+    overdue_sweeper.start()
+    email_outbox.start()
+    registration_index.start()
+    yield
+    await registration_index.stop()
+    await email_outbox.stop()
+    await overdue_sweeper.stop()
+    RSA.shutdown_decrypt_pool()
+    PasswordEncryption.shutdown_executor()
+    await async_db_manager.close()
+    await r.close_async()
+
+
+app = FastAPI(title="图书管理系统", lifespan=lifespan)
+app.add_middleware(LoadShedMiddleware)
 app.include_router(user.router, prefix="/user", tags=["用户"])
 app.include_router(book.router, prefix="/book", tags=["图书"])
 app.include_router(pic.router, prefix="/pic", tags=["图片"])
@@ -0,0 +1,2 @@
+-- /book/list 键集分页：按类型过滤时沿 (type, book_id) 顺序扫描
+CREATE INDEX idx_books_type_book_id ON books (type, book_id);
@@ -0,0 +1,5 @@
+-- /book/search 全文检索：ngram 分词支持中文书名，默认 ngram_token_size=2
+ALTER TABLE books ADD FULLTEXT INDEX ft_books_title_author_description (title, author, description) WITH PARSER ngram;
+
+-- /book/suggest 书名前缀补全
+CREATE INDEX idx_books_title ON books (title(64));
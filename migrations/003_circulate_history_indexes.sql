@@ -0,0 +1,6 @@
+-- /book/borrowList 键集分页：ORDER BY borrow_time DESC, id DESC
+-- InnoDB 二级索引隐式附带主键 id，(…, borrow_time) 即可覆盖 (borrow_time, id) 排序
+CREATE INDEX idx_circulate_borrow_time ON circulate (borrow_time);
+CREATE INDEX idx_circulate_username_borrow_time ON circulate (username, borrow_time);
+CREATE INDEX idx_circulate_book_id_borrow_time ON circulate (book_id, borrow_time);
+CREATE INDEX idx_circulate_is_return_borrow_time ON circulate (is_return, borrow_time);
@@ -0,0 +1,9 @@
+-- 逾期标记由后台任务增量维护（app/utils/overdue.py）
+-- due_time 为到期时间（毫秒），由 MySQL 自动维护，借阅 / 归还语句无需改动
+ALTER TABLE circulate
+    ADD COLUMN due_time BIGINT AS (borrow_time + borrow_long * 86400000) STORED;
+
+-- 后台任务：WHERE is_return = 0 AND is_time_out = 0 AND due_time < now ORDER BY due_time LIMIT n
+CREATE INDEX idx_circulate_due_time ON circulate (is_return, is_time_out, due_time);
+-- /book/overdue：WHERE is_return = 0 AND is_time_out = 1 ORDER BY borrow_time DESC, id DESC
+CREATE INDEX idx_circulate_overdue_borrow_time ON circulate (is_return, is_time_out, borrow_time);
@@ -0,0 +1,31 @@
+-- 借阅统计物化表：由 Book.borrow_book / borrow_batch / return_book 在同一事务内增量维护
+CREATE TABLE IF NOT EXISTS book_stats
+(
+    book_id        INT     NOT NULL PRIMARY KEY,
+    borrow_total   INT     NOT NULL DEFAULT 0,
+    active_loans   INT     NOT NULL DEFAULT 0,
+    returned_total INT     NOT NULL DEFAULT 0,
+    late_returns   INT     NOT NULL DEFAULT 0,
+    INDEX idx_book_stats_borrow_total (borrow_total)
+);
+
+CREATE TABLE IF NOT EXISTS user_stats
+(
+    username       VARCHAR(64) NOT NULL PRIMARY KEY,
+    borrow_total   INT         NOT NULL DEFAULT 0,
+    active_loans   INT         NOT NULL DEFAULT 0,
+    returned_total INT         NOT NULL DEFAULT 0,
+    late_returns   INT         NOT NULL DEFAULT 0,
+    INDEX idx_user_stats_active_loans (active_loans)
+);
+
+-- 回填历史数据（与 POST /book/stats/rebuild 相同）
+INSERT INTO book_stats (book_id, borrow_total, active_loans, returned_total, late_returns)
+SELECT book_id, COUNT(*), SUM(is_return = 0), SUM(is_return = 1), SUM(is_return = 1 AND is_time_out = 1)
+FROM circulate
+GROUP BY book_id;
+
+INSERT INTO user_stats (username, borrow_total, active_loans, returned_total, late_returns)
+SELECT username, COUNT(*), SUM(is_return = 0), SUM(is_return = 1), SUM(is_return = 1 AND is_time_out = 1)
+FROM circulate
+GROUP BY username;
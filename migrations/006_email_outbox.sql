@@ -0,0 +1,16 @@
+-- 邮件发件箱：注册等业务只写入该表，由后台任务（app/utils/outbox.py）批量发送
+-- status: 0 待发送  1 已发送  2 放弃（永久性错误或超过最大尝试次数）
+CREATE TABLE IF NOT EXISTS email_outbox
+(
+    id              BIGINT       NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    recipient       VARCHAR(255) NOT NULL,
+    subject         VARCHAR(255) NOT NULL,
+    body            MEDIUMTEXT   NOT NULL,
+    status          TINYINT      NOT NULL DEFAULT 0,
+    attempts        INT          NOT NULL DEFAULT 0,
+    next_attempt_at BIGINT       NOT NULL,
+    last_error      VARCHAR(512) NULL,
+    create_time     BIGINT       NOT NULL,
+    sent_time       BIGINT       NULL,
+    INDEX idx_email_outbox_due (status, next_attempt_at)
+);
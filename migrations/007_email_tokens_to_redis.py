@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""把 users.email_verification_token 中尚未使用的邮箱验证 token 迁移到 Redis
+
+部署新版本前后各执行一次（第二次用于补上部署窗口内旧进程新签发的 token）：
+    python -m migrations.007_email_tokens_to_redis [--dry-run]
+
+原 token 没有签发时间，迁移后统一获得完整的 EMAIL_TOKEN_TTL 有效期；
+迁移成功的行会清空 email_verification_token，重复执行是安全的。
+"""
+import sys
+
+from app.utils import db_manager, email_token_store
+
+BATCH_SIZE = 1000
+
+
+def main(dry_run: bool = False):
+    migrated = 0
+    last_id = 0
+    while True:
+        with db_manager.get_cursor(dictionary=True) as cursor:
+            cursor.execute("""
+                           SELECT id, username, email, email_verification_token
+                           FROM users
+                           WHERE id > %s
+                             AND email_verified = 0
+                             AND email_verification_token IS NOT NULL
+                           ORDER BY id
+                           LIMIT %s
+                           """, (last_id, BATCH_SIZE))
+            rows = cursor.fetchall()
+        if not rows:
+            break
+        last_id = rows[-1]["id"]
+
+        done = []
+        for row in rows:
+            if dry_run or email_token_store.issue(row["username"], row["email"], row["email_verification_token"]):
+                done.append((row["id"], row["email_verification_token"]))
+        if not dry_run and done:
+            with db_manager.get_cursor() as cursor:
+                cursor.executemany("""
+                                   UPDATE users
+                                   SET email_verification_token = NULL
+                                   WHERE id = %s
+                                     AND email_verification_token = %s
+                                   """, done)
+        migrated += len(done)
+        print(f"已迁移 {migrated} 个 token")
+
+    print(f"完成{'（试运行）' if dry_run else ''}，共 {migrated} 个 token")
+
+
+if __name__ == "__main__":
+    main("--dry-run" in sys.argv[1:])
@@ -0,0 +1,20 @@
+-- 全馆借阅汇总分片计数表：借阅、归还事务随机更新一个分片（id 为分片号，分片数见 LIBRARY_STATS_SHARDS），
+-- GET /book/stats/summary 对各分片求和。单个分片的 active_loans 可能为负，因此各列不能设为 UNSIGNED
+CREATE TABLE IF NOT EXISTS library_stats
+(
+    id             TINYINT NOT NULL PRIMARY KEY,
+    borrow_total   INT     NOT NULL DEFAULT 0,
+    active_loans   INT     NOT NULL DEFAULT 0,
+    returned_total INT     NOT NULL DEFAULT 0,
+    late_returns   INT     NOT NULL DEFAULT 0
+);
+
+-- 回填历史数据到 0 号分片（与 POST /book/stats/rebuild 相同）
+DELETE FROM library_stats;
+INSERT INTO library_stats (id, borrow_total, active_loans, returned_total, late_returns)
+SELECT 0,
+       COUNT(*),
+       COALESCE(SUM(is_return = 0), 0),
+       COALESCE(SUM(is_return = 1), 0),
+       COALESCE(SUM(is_return = 1 AND is_time_out = 1), 0)
+FROM circulate;